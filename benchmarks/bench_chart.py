@@ -0,0 +1,68 @@
+"""Compare the chart payload sent per filter change against a full figure.
+
+Run from the project root:
+
+    python -m benchmarks.bench_chart --rows 1000000
+"""
+import argparse
+import json
+
+import plotly.express as px
+import plotly.graph_objects as go
+from plotly.utils import PlotlyJSONEncoder
+
+from insight.aggregates import TimeCube
+from insight.data import prepare_data, to_dollars
+from insight.fakes import synthetic_values
+from insight.layout import create_pnl_chart, pnl_series
+
+from .common import timed
+
+
+def full_figure(df):
+    "The chart as it was built before, as a validated go.Figure."
+    df = to_dollars(df)
+    fig = go.Figure(
+        data=[
+            go.Bar(name="Sales", x=df["DateTime"], y=df["Sales"]),
+            go.Bar(name="COGS", x=df["DateTime"], y=df["COGS"]),
+            go.Scatter(
+                name="Profit",
+                x=df["DateTime"],
+                y=df["Profit"],
+                line=dict(color="darkslategrey", width=1.5),
+                marker=dict(size=5),
+                mode="lines+markers",
+            ),
+        ]
+    )
+    fig.update_layout(dict(title="P&L Trend", colorway=px.colors.qualitative.Set2))
+    return fig
+
+
+def serialise(figure) -> str:
+    return json.dumps(figure, cls=PlotlyJSONEncoder)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+
+    totals = TimeCube(prepare_data(synthetic_values(args.rows))).get("Hardware", None)
+    print(f"{len(totals)} months, {args.repeat} updates")
+
+    def repeat(fn):
+        return lambda: [serialise(fn(totals)) for _ in range(args.repeat)][-1]
+
+    figure = timed("go.Figure", repeat(full_figure))
+    timed("dict figure", repeat(create_pnl_chart))
+    series = timed("series update", repeat(pnl_series))
+
+    print(f"{'go.Figure bytes':<28}{len(figure):>8}")
+    print(f"{'series update bytes':<28}{len(series):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Time the dashboard's data path and callbacks on synthetic sheets.
+
+Covers parsing, filtering, aggregation, the chart and table callbacks, the
+CSV export, and import/startup, for each size given (10k, 100k, 1m, 10m):
+
+    python -m benchmarks.bench_dashboard --sizes 10k 1m
+    python -m benchmarks.bench_dashboard --sizes 10m --memory
+
+--memory adds the peak traced allocation of each step, which slows the
+steps down. The 10m sheet needs around 16 GB of memory to generate.
+"""
+import argparse
+import subprocess
+import sys
+
+from insight.data import prepare_data
+from insight.fakes import synthetic_values
+from insight.filters import apply_filters
+from insight.layout import create_pnl_chart, resample_totals
+from insight.sync import DataVersion
+
+from .common import SIZES, dashboard_app, max_rss_mb, timed
+
+SORT_BY = [{"column_id": "Sales", "direction": "desc"}]
+
+
+def time_startup() -> None:
+    "Import and app creation, each in a fresh interpreter."
+    setup = (
+        "import os; os.environ.setdefault('APP_SETTINGS', 'config.TestingConfig');"
+        "os.environ.setdefault('SECRET_KEY', 'benchmark');"
+        "os.environ.setdefault('DATABASE_URL', 'sqlite://');"
+    )
+    for label, code in [
+        ("python startup", "pass"),
+        ("import insight", "import insight"),
+        ("create_app (CLI)", setup + "import manage"),
+        ("create_app", setup + "from insight import create_app; create_app()"),
+    ]:
+        timed(label, lambda: subprocess.run([sys.executable, "-c", code], check=True))
+
+
+def bench(rows: int, trace_memory: bool) -> None:
+    def step(label, fn):
+        return timed(label, fn, trace_memory)
+
+    values = timed("generate sheet", lambda: synthetic_values(rows))
+    df = step("prepare_data", lambda: prepare_data(values))
+    version = step("DataVersion.build", lambda: DataVersion.build(df, ""))
+    row_bytes = version.nbytes / max(len(df), 1)
+    print(f"{'frame size per row':<28}{row_bytes:>8.1f}B")
+    step("apply_filters (scan)", lambda: apply_filters(df, "Hardware", "Alpha"))
+    dff = step(
+        "apply_filters (index)",
+        lambda: apply_filters(df, "Hardware", None, version.index),
+    )
+    step("resample_totals (week)", lambda: resample_totals(dff, "week"))
+    step(
+        "TimeCube.get (week)",
+        lambda: version.cube.get("Hardware", None, "week", "2019-01-01"),
+    )
+    totals = step("TimeCube.get (month)", lambda: version.cube.get("Hardware", None))
+    step("create_pnl_chart", lambda: create_pnl_chart(totals))
+    del df, dff, version
+
+    app = step("load into app", lambda: dashboard_app(values))
+    from insight.app import callback_cache, update_bar_chart, update_table
+
+    table = update_table.__wrapped__
+    args = (None, "Hardware", None, 3, 20, SORT_BY, "{Sales} > 1000")
+    callback_cache.clear()
+    step("update_table (miss)", lambda: table(*args))
+    step("update_table (hit)", lambda: table(*args))
+    step(
+        "update_bar_chart (miss)",
+        lambda: update_bar_chart.__wrapped__(None, None, "Alpha", "quarter"),
+    )
+
+    client = app.test_client()
+    body = step(
+        "export CSV",
+        lambda: client.get("/export/csv?department=Hardware").get_data(),
+    )
+    print(f"{'export CSV size':<28}{len(body) / 1e6:>8.1f}MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", nargs="+", choices=SIZES, default=["10k", "1m"])
+    parser.add_argument("--memory", action="store_true")
+    args = parser.parse_args()
+
+    time_startup()
+    for size in args.sizes:
+        print(f"\n{SIZES[size]:,} rows")
+        bench(SIZES[size], args.memory)
+    print(f"\n{'max RSS':<28}{max_rss_mb():>8.0f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Compare reading a sheet in one request against concurrent row blocks.
+
+Uses the fake Sheets service with a simulated per-request and per-row
+latency, so no credentials or network are needed. Run from the project root:
+
+    python -m benchmarks.bench_fetch --rows 1000000
+"""
+import argparse
+
+from insight.data import FETCH_BLOCK_ROWS, FETCH_WORKERS, fetch_data
+from insight.fakes import FakeSheetsService, synthetic_values
+
+from .common import timed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--row-latency", type=float, default=2e-6)
+    parser.add_argument("--block-rows", type=int, default=FETCH_BLOCK_ROWS)
+    parser.add_argument("--workers", type=int, default=FETCH_WORKERS)
+    args = parser.parse_args()
+
+    service = FakeSheetsService(
+        synthetic_values(args.rows),
+        latency=args.latency,
+        row_latency=args.row_latency,
+    )
+    print(f"{args.rows:,} rows")
+
+    timed(
+        "single request",
+        lambda: fetch_data("bench", "Financial Data!A:F", service=service),
+    )
+    timed(
+        f"{args.workers} workers",
+        lambda: fetch_data(
+            "bench",
+            "Financial Data",
+            service=service,
+            block_rows=args.block_rows,
+            workers=args.workers,
+        ),
+    )
+
+
+if __name__ == "__main__":
+    main()
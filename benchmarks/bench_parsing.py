@@ -0,0 +1,65 @@
+"""Compare money parsing in prepare_data against the old per-cell Decimal path.
+
+Run from the project root:
+
+    python -m benchmarks.bench_parsing --rows 1000000
+"""
+import argparse
+import re
+from decimal import Decimal
+from typing import Optional
+
+import pandas as pd
+
+from insight.data import MONEY_COLUMNS, parse_money
+from insight.fakes import synthetic_values
+
+from .common import timed
+
+
+def to_decimal(s: str) -> Optional[Decimal]:
+    "The parser prepare_data used before parse_money, kept for comparison."
+    pattern = re.compile(r"(?P<paren>\()?(?P<numeral>(\d+,?)+(\.(\d+))?)")
+    if match := pattern.search(s):
+        groups = match.groupdict()
+        sign = -1 if groups["paren"] is not None else 1
+        numeral = groups["numeral"].replace(",", "")
+        return sign * Decimal(numeral)
+    else:
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    values = synthetic_values(args.rows)
+    raw = pd.DataFrame(values[1:], columns=values[0])
+    print(f"{args.rows:,} rows")
+
+    legacy = timed(
+        "to_decimal (apply)",
+        lambda: {c: raw[c].apply(to_decimal) for c in MONEY_COLUMNS},
+    )
+    cents = timed(
+        "parse_money (vectorized)",
+        lambda: {c: parse_money(raw[c]) for c in MONEY_COLUMNS},
+    )
+    timed(
+        "monthly sum, Decimal",
+        lambda: pd.DataFrame(legacy).groupby(raw["Date"].str[:2]).sum(),
+    )
+    timed(
+        "monthly sum, int64 cents",
+        lambda: pd.DataFrame(cents).groupby(raw["Date"].str[:2]).sum(),
+    )
+
+    for c in MONEY_COLUMNS:
+        expected = (legacy[c] * 100).astype("int64")
+        assert (expected == cents[c]).all(), f"{c} differs"
+    print("Parsed amounts match")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Compare Dataset snapshots stored as Arrow against the old JSON payloads.
+
+Run from the project root:
+
+    python -m benchmarks.bench_snapshots --rows 1000000
+"""
+import argparse
+import json
+
+from insight.data import prepare_data, spreadsheet_hash
+from insight.fakes import synthetic_values
+from insight.snapshots import dump_frame, load_frame
+
+from .common import timed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    values = synthetic_values(args.rows)
+    digest = spreadsheet_hash(values)
+    frame = prepare_data(values)
+    print(f"{args.rows:,} rows")
+
+    payload = timed("dump JSON", lambda: json.dumps(values))
+    timed("load JSON + prepare_data", lambda: prepare_data(json.loads(payload)))
+    snapshot = timed("dump Arrow", lambda: dump_frame(frame, digest))
+    timed("load Arrow", lambda: load_frame(snapshot))
+
+    print(f"{'JSON size':<28}{len(payload.encode()) / 1e6:>8.1f}MB")
+    print(f"{'Arrow size':<28}{len(snapshot) / 1e6:>8.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
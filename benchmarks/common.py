@@ -0,0 +1,61 @@
+import os
+import resource
+import tempfile
+import time
+import tracemalloc
+
+from insight.data import SheetData, spreadsheet_hash
+
+# Synthetic sheet sizes, by the names accepted on the command line
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+
+
+def timed(label: str, fn, trace_memory: bool = False):
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    line = f"{label:<28}{elapsed:>8.3f}s"
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        line += f"{peak / 1e6:>10.1f}MB peak"
+    print(line)
+    return result
+
+
+def max_rss_mb() -> float:
+    "High-water mark of this process's resident memory."
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def dashboard_app(values: SheetData, timeout: float = 600):
+    """The Flask app serving `values` as its default dataset, with login
+    disabled, once the values are loaded.
+
+    The sheet fetch is stubbed out and the database is a throwaway SQLite file,
+    so no credentials or services are needed.
+    """
+    workdir = tempfile.mkdtemp(prefix="insight-bench-")
+    os.environ.setdefault("APP_SETTINGS", "config.TestingConfig")
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{workdir}/insight.db")
+
+    from insight import create_app, db
+    from insight.registry import registry
+
+    app = create_app()
+    app.config.update(LOGIN_DISABLED=True, SNAPSHOT_DIR=workdir)
+    with app.app_context():
+        db.create_all()
+    registry.make_source = lambda app, spec: lambda: values
+
+    store = registry.get()
+    digest = spreadsheet_hash(values)
+    deadline = time.monotonic() + timeout
+    while store.version.spreadsheet_hash != digest:
+        if time.monotonic() > deadline:
+            raise TimeoutError("The dataset wasn't loaded")
+        time.sleep(0.05)
+    return app
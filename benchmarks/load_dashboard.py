@@ -0,0 +1,142 @@
+"""Drive concurrent callback requests at the dashboard and report latencies.
+
+Serves the app in-process on a synthetic sheet, with the sheet fetch
+stubbed out and login disabled, then has each client thread post random
+filter, page and sort changes to `_dash-update-component`:
+
+    python -m benchmarks.load_dashboard --rows 1000000 --clients 16
+
+Pass --url to load a server that is already running instead, e.g. gunicorn
+with LOGIN_DISABLED set.
+"""
+import argparse
+import json
+import logging
+import random
+import statistics
+import threading
+import time
+import urllib.request
+from typing import Any, Dict, List, Optional
+
+from insight.aggregates import GRANULARITIES
+from insight.fakes import DEPARTMENTS, PRODUCTS, synthetic_values
+
+from .common import dashboard_app, max_rss_mb
+
+
+def _prop(id: str, property: str, value: Any = None) -> Dict[str, Any]:
+    return {"id": id, "property": property, "value": value}
+
+
+def table_request(rng: random.Random) -> Dict[str, Any]:
+    sort_by = rng.choice(
+        [[], [{"column_id": rng.choice(["Date", "Sales"]), "direction": "desc"}]]
+    )
+    return {
+        "output": "..sales-table.data...sales-table.page_count..",
+        "outputs": [_prop("sales-table", "data"), _prop("sales-table", "page_count")],
+        "inputs": [
+            _prop("dataset-selector", "value"),
+            _prop("department-filter", "value", rng.choice(DEPARTMENTS + [None])),
+            _prop("product-filter", "value", rng.choice(PRODUCTS + [None])),
+            _prop("sales-table", "page_current", rng.randrange(50)),
+            _prop("sales-table", "page_size", 20),
+            _prop("sales-table", "sort_by", sort_by),
+            _prop("sales-table", "filter_query", ""),
+            _prop("data-version", "data"),
+        ],
+        "changedPropIds": ["sales-table.page_current"],
+    }
+
+
+def chart_request(rng: random.Random) -> Dict[str, Any]:
+    return {
+        "output": "chart-series.data",
+        "outputs": _prop("chart-series", "data"),
+        "inputs": [
+            _prop("dataset-selector", "value"),
+            _prop("department-filter", "value", rng.choice(DEPARTMENTS + [None])),
+            _prop("product-filter", "value", rng.choice(PRODUCTS + [None])),
+            _prop("granularity", "value", rng.choice(list(GRANULARITIES))),
+            _prop("date-range", "start_date", rng.choice([None, "2019-01-01"])),
+            _prop("date-range", "end_date", None),
+            _prop("data-version", "data"),
+        ],
+        "changedPropIds": ["department-filter.value"],
+    }
+
+
+def run_client(
+    url: str, requests: int, seed: int, latencies: List[float], errors: List[str]
+) -> None:
+    rng = random.Random(seed)
+    for _ in range(requests):
+        body = rng.choice([table_request, chart_request])(rng)
+        request = urllib.request.Request(
+            f"{url}/dashboard/_dash-update-component",
+            data=json.dumps(body).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+        except Exception as e:
+            errors.append(repr(e))
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+def serve(rows: int) -> str:
+    "Start the app on a free local port and return its URL."
+    from werkzeug.serving import make_server
+
+    app = dashboard_app(synthetic_values(rows))
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100, help="per client")
+    parser.add_argument("--url", help="an already running server")
+    args = parser.parse_args()
+
+    url: Optional[str] = args.url or serve(args.rows)
+    latencies: List[float] = []
+    errors: List[str] = []
+    threads = [
+        threading.Thread(
+            target=run_client, args=(url, args.requests, seed, latencies, errors)
+        )
+        for seed in range(args.clients)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(latencies)} requests, {len(errors)} errors in {elapsed:.1f}s")
+    print(f"{'throughput':<28}{len(latencies) / elapsed:>8.1f}/s")
+    if len(latencies) > 1:
+        cuts = statistics.quantiles(latencies, n=100)
+        for label, value in [("p50", cuts[49]), ("p95", cuts[94]), ("p99", cuts[98])]:
+            print(f"{label:<28}{value * 1000:>8.1f}ms")
+    if errors:
+        print("first error:", errors[0])
+    if not args.url:
+        from insight.app import callback_cache
+
+        print(f"{'cache hits/misses':<28}{callback_cache.hits}/{callback_cache.misses}")
+        print(f"{'max RSS':<28}{max_rss_mb():>8.0f}MB")
+
+
+if __name__ == "__main__":
+    main()
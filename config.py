@@ -1,3 +1,4 @@
+import json
 import os
 
 basedir = os.path.abspath(os.path.dirname(__file__))
@@ -10,6 +11,80 @@ class Config(object):
     SECRET_KEY = os.environ["SECRET_KEY"]
     SQLALCHEMY_DATABASE_URI = os.environ["DATABASE_URL"]
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Connection pool per worker process. SQLite uses its own pool classes,
+    # which take none of these.
+    SQLALCHEMY_ENGINE_OPTIONS = (
+        {}
+        if SQLALCHEMY_DATABASE_URI.startswith("sqlite")
+        else {
+            "pool_size": int(os.environ.get("DB_POOL_SIZE", 5)),
+            "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", 10)),
+            "pool_timeout": float(os.environ.get("DB_POOL_TIMEOUT", 30)),
+            "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", 1800)),
+            "pool_pre_ping": True,
+        }
+    )
+    # Seconds a signed-in user is cached before being read again
+    USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", 60))
+    SPREADSHEET_ID = os.environ.get(
+        "SPREADSHEET_ID", "1d-OnGMQG8IlPIG2Ru2SmiH2n9klzMxivfb3mD3imRBE"
+    )
+    SPREADSHEET_RANGE = os.environ.get("SPREADSHEET_RANGE", "Financial Data")
+    # Sheets selectable in the dashboard, as JSON mapping a display name to
+    # {"spreadsheet_id": ..., "range": ...}, or {"path": ...} for a CSV, Excel
+    # or Parquet file; the first is shown by default. Sources with saved
+    # Dataset rows are added too.
+    DATASETS = json.loads(os.environ.get("DATASETS") or "null") or {
+        SPREADSHEET_RANGE: {
+            "spreadsheet_id": SPREADSHEET_ID,
+            "range": SPREADSHEET_RANGE,
+        }
+    }
+    # Bytes of loaded frames above which the least recently used datasets are
+    # unloaded; 0 keeps every opened dataset in memory.
+    DATASET_MEMORY_BUDGET = int(os.environ.get("DATASET_MEMORY_BUDGET", 0))
+    # Seconds between polls of the spreadsheet; 0 syncs once at startup only.
+    SYNC_INTERVAL = float(os.environ.get("SYNC_INTERVAL", 300))
+    # Local copies of the last fetched sheets, served when a dataset is opened
+    # before its sheet is fetched again. Defaults to the instance folder.
+    SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR")
+    # Distinct `Dataset` snapshots per sheet kept by `flask datasets compact`
+    SNAPSHOTS_KEPT = int(os.environ.get("SNAPSHOTS_KEPT", 10))
+    # With several worker processes, a directory where one worker writes each
+    # dataset for the others to memory-map, instead of each fetching and
+    # holding its own copy. Checked for new versions every SHARED_POLL_INTERVAL
+    # seconds.
+    SHARED_DATA_DIR = os.environ.get("SHARED_DATA_DIR")
+    SHARED_POLL_INTERVAL = float(os.environ.get("SHARED_POLL_INTERVAL", 1))
+    # Uploaded CSV, Excel and Parquet files, each served as a dataset.
+    # Defaults to instance/uploads.
+    UPLOAD_DIR = os.environ.get("UPLOAD_DIR")
+    MAX_CONTENT_LENGTH = int(os.environ.get("MAX_UPLOAD_BYTES", 0)) or None
+    # A directory whose CSV, Excel and Parquet files are served as datasets,
+    # scanned for new and changed files every WATCH_INTERVAL seconds.
+    WATCH_DIR = os.environ.get("WATCH_DIR")
+    WATCH_INTERVAL = float(os.environ.get("WATCH_INTERVAL", 10))
+    # "sheets", or "local" to read LOCAL_DATA_PATH (or generated sample data)
+    # instead of calling the Sheets API.
+    DATA_SOURCE = os.environ.get("DATA_SOURCE", "sheets")
+    LOCAL_DATA_PATH = os.environ.get("LOCAL_DATA_PATH")
+    # Bearer token accepted by POST /datasets/refresh besides a login session
+    REFRESH_TOKEN = os.environ.get("REFRESH_TOKEN")
+    # Seconds between dashboards' checks for a new data version; 0 disables
+    # them, so pages only show new data once reloaded.
+    VERSION_POLL_INTERVAL = float(os.environ.get("VERSION_POLL_INTERVAL", 30))
+    # Datasets of up to this many rows are sent to the browser once, and
+    # charted and tabulated there; larger ones are served a page at a time.
+    # 0 serves them all from the server.
+    CLIENTSIDE_MAX_ROWS = int(os.environ.get("CLIENTSIDE_MAX_ROWS", 50_000))
+    # Callback results kept per worker for the current data version
+    CALLBACK_CACHE_SIZE = int(os.environ.get("CALLBACK_CACHE_SIZE", 256))
+    # /metrics needs a login session, or this as a bearer token for scrapers
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+    # Fraction of callback calls run under cProfile, with stats written to
+    # PROFILE_DIR (defaults to instance/profiles).
+    PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+    PROFILE_DIR = os.environ.get("PROFILE_DIR")
 
 
 class ProductionConfig(Config):
@@ -22,4 +97,6 @@ class DevelopmentConfig(Config):
 
 
 class TestingConfig(Config):
-    TESTING = True
\ No newline at end of file
+    TESTING = True
+    DATA_SOURCE = "local"
+    SYNC_INTERVAL = 0
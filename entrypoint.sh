@@ -1,3 +1,3 @@
 #!/usr/bin/env bash
-flask db upgrade && \
-gunicorn --bind 0.0.0.0:$PORT --workers 1 --threads 8 --timeout 0 'wsgi:app'
\ No newline at end of file
+FLASK_APP=manage flask db upgrade && \
+gunicorn --bind 0.0.0.0:$PORT --workers ${WEB_CONCURRENCY:-1} --threads ${WEB_THREADS:-8} --timeout 0 'wsgi:app'
\ No newline at end of file
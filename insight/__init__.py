@@ -6,52 +6,106 @@ from flask import Flask, redirect, url_for
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, login_required
 from flask_migrate import Migrate
-from flask_admin import Admin
-from flask_admin.contrib.sqla import ModelView
-
-from .app import app as dash_app
 
 
 db = SQLAlchemy()
 
 
-def create_app():
-    "Create and configure the app."
+def create_app(dashboard: bool = True):
+    """Create and configure the app.
+
+    With `dashboard=False` only the database and migrations are set up, so
+    CLI commands such as `flask db upgrade` start without importing pandas,
+    Dash or plotly; see entrypoint.sh.
+    """
     app = Flask(__name__, instance_relative_config=True)
     app.config.from_object(os.environ["APP_SETTINGS"])
 
     db.init_app(app)
+    migrate = Migrate(app, db)
+
+    from .models import User
+    from .retention import datasets_cli
+
+    app.cli.add_command(datasets_cli)
+
+    if not dashboard:
+        return app
+
+    from flask_admin import Admin
+    from flask_admin.contrib.sqla import ModelView
+
+    from .app import app as dash_app, callback_cache
 
     login_manager = LoginManager()
     login_manager.login_view = "auth.login"
     login_manager.init_app(app)
 
-    from .models import User, Dataset
+    # blueprint for auth routes in our app
+    from .auth import auth as auth_blueprint, user_cache
+
+    user_cache.ttl = app.config["USER_CACHE_TTL"]
 
     @login_manager.user_loader
     def load_user(user_id):
-        # since the user_id is just the primary key of our user table, use it in the query for the user
-        return User.query.get(int(user_id))
-
-    # blueprint for auth routes in our app
-    from .auth import auth as auth_blueprint
+        # since the user_id is just the primary key of our user table, use it
+        # to look up the user, cached so most requests skip the query
+        return user_cache.get(int(user_id))
 
     app.register_blueprint(auth_blueprint)
 
+    # registered before the login_required wrapping below, which covers it
+    from .export import export as export_blueprint
+
+    app.register_blueprint(export_blueprint)
+
+    from .uploads import uploads as uploads_blueprint
+
+    app.register_blueprint(uploads_blueprint)
+
+    from .datasets import datasets as datasets_blueprint
+
+    # Checks sessions itself, so schedulers can use REFRESH_TOKEN instead
+    app.register_blueprint(datasets_blueprint)
+
+    from .metrics import instrument_callbacks, metrics as metrics_blueprint, profiler
+
+    # Scraped without a login session; see METRICS_TOKEN
+    app.register_blueprint(metrics_blueprint)
+
     dash_app.init_app(app)
+    callback_cache.maxsize = app.config["CALLBACK_CACHE_SIZE"]
+    instrument_callbacks(dash_app)
+    profiler.rate = app.config["PROFILE_SAMPLE_RATE"]
+    profiler.directory = app.config["PROFILE_DIR"] or os.path.join(
+        app.instance_path, "profiles"
+    )
 
-    migrate = Migrate(app, db)
+    from .registry import registry
+
+    registry.init_app(app)
+
+    @app.before_first_request
+    def discover_datasets():
+        # Deferred to the first request so CLI commands such as
+        # `flask db upgrade` don't query the tables. Each dataset's snapshot
+        # is loaded, and its sheet polled, once someone first opens it.
+        registry.discover()
+
+    from .admin import DatasetAdmin
 
     admin = Admin(app)
     admin.add_view(ModelView(User, db.session))
-    admin.add_view(ModelView(Dataset, db.session))
+    admin.add_view(DatasetAdmin(name="Dataset", endpoint="dataset"))
 
     @app.route("/")
     def index():
         return redirect(url_for("/dashboard/"))
 
     for name, method in dash_app.server.view_functions.items():
-        if not name.startswith(auth_blueprint.name):
+        if not name.startswith(
+            (auth_blueprint.name, metrics_blueprint.name, datasets_blueprint.name)
+        ):
             dash_app.server.view_functions[name] = login_required(method)
 
     return app
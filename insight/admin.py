@@ -0,0 +1,85 @@
+"""Flask-Admin view of the `Dataset` snapshots.
+
+The list selects only the metadata recorded with each snapshot, never the
+payloads, and pages newest first by (created_at, id) rather than by offset,
+so each page costs the same however many snapshots pile up. A snapshot's
+rows are decoded only when someone downloads it.
+"""
+from datetime import datetime
+from typing import Optional, Tuple
+
+from flask import Response, abort, request
+from flask_admin import BaseView, expose
+
+from . import db
+from .export import iter_csv
+from .models import Dataset
+from .snapshots import load_frame
+
+PAGE_SIZE = 50
+
+METADATA_COLUMNS = [
+    Dataset.id,
+    Dataset.created_at,
+    Dataset.spreadsheet_id,
+    Dataset.spreadsheet_range,
+    Dataset.spreadsheet_hash,
+    Dataset.row_count,
+    Dataset.byte_size,
+]
+
+
+def parse_cursor(cursor: str) -> Tuple[datetime, int]:
+    "The (created_at, id) of the last row shown, from `<iso date>,<id>`."
+    try:
+        created_at, id = cursor.rsplit(",", 1)
+        return datetime.fromisoformat(created_at), int(id)
+    except ValueError:
+        abort(400)
+
+
+def format_cursor(created_at: datetime, id: int) -> str:
+    return f"{created_at.isoformat()},{id}"
+
+
+class DatasetAdmin(BaseView):
+    page_size = PAGE_SIZE
+
+    @expose("/")
+    def index(self):
+        query = Dataset.query.with_entities(*METADATA_COLUMNS)
+        after: Optional[str] = request.args.get("after")
+        if after:
+            created_at, id = parse_cursor(after)
+            query = query.filter(
+                db.or_(
+                    Dataset.created_at < created_at,
+                    db.and_(Dataset.created_at == created_at, Dataset.id < id),
+                )
+            )
+        rows = (
+            query.order_by(Dataset.created_at.desc(), Dataset.id.desc())
+            .limit(self.page_size + 1)
+            .all()
+        )
+        # The extra row only tells whether there is an older page
+        older = None
+        if len(rows) > self.page_size:
+            rows = rows[: self.page_size]
+            older = format_cursor(rows[-1].created_at, rows[-1].id)
+        return self.render(
+            "admin/datasets.html", rows=rows, older=older, first_page=not after
+        )
+
+    @expose("/<int:id>.csv")
+    def download(self, id: int):
+        "Stream one snapshot's rows as CSV."
+        payload = db.session.query(Dataset.data).filter(Dataset.id == id).scalar()
+        if payload is None:
+            abort(404)
+        frame, _ = load_frame(bytes(payload))
+        return Response(
+            iter_csv(frame),
+            mimetype="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="dataset-{id}.csv"'},
+        )
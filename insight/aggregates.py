@@ -0,0 +1,143 @@
+from datetime import date
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .data import MONEY_COLUMNS
+
+CubeKey = Tuple[Optional[str], Optional[str]]
+DateLike = Union[str, date, pd.Timestamp, None]
+
+TOTALS_COLUMNS = ["DateTime"] + MONEY_COLUMNS
+
+# Chart granularities, by the pandas frequencies `resample` would use. Each
+# bucket is labelled with its last day.
+GRANULARITIES = {"week": "W", "month": "M", "quarter": "Q", "year": "A"}
+
+
+class DailyTotals:
+    """Running Sales/COGS/Profit totals over the days that have rows.
+
+    `cumulative[i]` holds the totals of the days before `days[i]`, so the
+    totals of any run of days are one subtraction.
+    """
+
+    def __init__(self, days: np.ndarray, totals: np.ndarray) -> None:
+        self.days = days
+        self.cumulative = np.zeros((len(days) + 1, totals.shape[1]), dtype=np.int64)
+        np.cumsum(totals, axis=0, out=self.cumulative[1:])
+
+    @property
+    def totals(self) -> np.ndarray:
+        return np.diff(self.cumulative, axis=0)
+
+    def __add__(self, other: "DailyTotals") -> "DailyTotals":
+        days, inverse = np.unique(
+            np.concatenate([self.days, other.days]), return_inverse=True
+        )
+        totals = np.zeros((len(days), self.cumulative.shape[1]), dtype=np.int64)
+        np.add.at(totals, inverse, np.concatenate([self.totals, other.totals]))
+        return DailyTotals(days, totals)
+
+
+class TimeCube:
+    """Daily Sales/COGS/Profit for every (department, product) pair.
+
+    Rollups over all departments and/or all products are stored under `None`,
+    so each dropdown combination is a dictionary lookup. Weeks, months,
+    quarters and years are summed from the running daily totals, so a query
+    costs time in the number of buckets rather than of rows. Built once per
+    data version; each result matches resampling the filtered rows.
+    """
+
+    def __init__(self, df: pd.DataFrame) -> None:
+        self._totals: Dict[CubeKey, DailyTotals] = {}
+        if df.empty:
+            return
+
+        daily = df.groupby(
+            ["Department", "Product", "DateTime"], sort=False, observed=True
+        )[MONEY_COLUMNS].sum()
+        self._add(daily, ["Department", "Product"], lambda k: k)
+        self._add(daily, ["Department"], lambda k: (k, None))
+        self._add(daily, ["Product"], lambda k: (None, k))
+        self._add(daily, [], lambda k: (None, None))
+
+    def get(
+        self,
+        department: Optional[str],
+        product: Optional[str],
+        granularity: str = "month",
+        start: DateLike = None,
+        end: DateLike = None,
+    ) -> pd.DataFrame:
+        """Totals per bucket of rows from `start` to `end`, both inclusive.
+
+        Buckets run from the first with rows to the last, including any
+        empty ones between them.
+        """
+        daily = self._totals.get((department or None, product or None))
+        freq = GRANULARITIES[granularity]
+        if daily is None:
+            return _empty_totals()
+
+        days = daily.days
+        lo = 0 if start is None else np.searchsorted(days, _day(start), "left")
+        hi = len(days) if end is None else np.searchsorted(days, _day(end), "right")
+        if lo >= hi:
+            return _empty_totals()
+
+        offset = pd.tseries.frequencies.to_offset(freq)
+        first, last = (
+            offset.rollforward(pd.Timestamp(days[i], unit="D")) for i in (lo, hi - 1)
+        )
+        labels = pd.date_range(first, last, freq=freq)
+        label_days = labels.values.astype("datetime64[D]").astype(np.int64)
+        bounds = np.searchsorted(days, label_days, "right")
+        bounds = np.concatenate([[lo], np.minimum(bounds[:-1], hi), [hi]])
+        totals = np.diff(daily.cumulative[bounds], axis=0)
+
+        return pd.DataFrame(totals, columns=MONEY_COLUMNS).assign(
+            DateTime=labels.to_numpy()
+        )[TOTALS_COLUMNS]
+
+    def __len__(self) -> int:
+        return len(self._totals)
+
+    def __add__(self, other: "TimeCube") -> "TimeCube":
+        "Totals over the rows of both cubes, e.g. once rows are appended."
+        combined = TimeCube.__new__(TimeCube)
+        combined._totals = dict(self._totals)
+        for key, daily in other._totals.items():
+            if key in combined._totals:
+                daily = combined._totals[key] + daily
+            combined._totals[key] = daily
+        return combined
+
+    def _add(self, daily: pd.DataFrame, levels: List[str], key) -> None:
+        rolled = daily.groupby(level=levels + ["DateTime"], observed=True).sum()
+        if not levels:
+            groups = [(None, rolled)]
+        else:
+            # A one-element level list would make pandas yield 1-tuples
+            groups = rolled.groupby(
+                level=levels if len(levels) > 1 else levels[0], observed=True
+            )
+        for group, totals in groups:
+            totals = totals.droplevel(levels) if levels else totals
+            days = totals.index.values.astype("datetime64[D]").astype(np.int64)
+            self._totals[key(group)] = DailyTotals(
+                days, totals[MONEY_COLUMNS].to_numpy(np.int64)
+            )
+
+
+def _day(value: DateLike) -> int:
+    "Days since the epoch."
+    return pd.Timestamp(value).to_datetime64().astype("datetime64[D]").astype(np.int64)
+
+
+def _empty_totals() -> pd.DataFrame:
+    return pd.DataFrame({"DateTime": pd.Series([], dtype="datetime64[ns]")}).assign(
+        **{c: pd.Series([], dtype="int64") for c in MONEY_COLUMNS}
+    )
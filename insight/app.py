@@ -1,132 +1,254 @@
-from dash_bootstrap_components._components.FormGroup import FormGroup
 import os
-import re
-from decimal import Decimal
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple
 
-from apiclient import discovery
 import dash
-from dash_table import DataTable, FormatTemplate
-import dash_core_components as dcc
-import dash_html_components as html
-from dash.dependencies import Input, Output, State
-from dash_extensions import Download
-from dash_extensions.snippets import send_data_frame
+from dash.dependencies import ClientsideFunction, Input, Output, State
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from dotenv import load_dotenv
 
-from .layout import create_pnl_chart, monthly_totals, set_layout, table_columns
+from .cache import CallbackCache, memoize
+from .clientside import SERVER, render_mode
+from .export import export_url
+from .filters import apply_filters
+from .layout import (
+    APPLY_PNL_SERIES,
+    NARROW_FILTER_OPTIONS,
+    chart_content,
+    date_bounds,
+    pnl_series,
+    set_layout,
+    table_content,
+)
+from .metrics import Collected, collector, record_rows
+from .registry import registry
+from .table import table_page
 
 load_dotenv()
 
-SheetData = List[List[str]]
-
+app = dash.Dash(
+    __name__,
+    external_stylesheets=[dbc.themes.MINTY],
+    prevent_initial_callbacks=True,
+    routes_pathname_prefix="/dashboard/",
+)
+app.title = "Insight Analytics"
+set_layout(app, lambda: registry.names, registry.version)
 
-def fetch_data() -> SheetData:
-    service = discovery.build("sheets", "v4")
-    # TODO: move spreadsheet parameters into config
-    spreadsheet_id = "1d-OnGMQG8IlPIG2Ru2SmiH2n9klzMxivfb3mD3imRBE"
-    range_name = "Financial Data"
-    sheet = service.spreadsheets()
-    result = (
-        sheet.values().get(spreadsheetId=spreadsheet_id, range=range_name).execute()
+# Results are shared across users and threads until the data changes.
+callback_cache = CallbackCache(maxsize=256)
+collector.add(
+    Collected(
+        "insight_callback_cache_hits_total",
+        "Callback results served from the cache.",
+        "counter",
+        lambda: callback_cache.hits,
     )
-    values = result.get("values", [])
-    if not values:
-        raise RuntimeError("No data found")
+)
+collector.add(
+    Collected(
+        "insight_callback_cache_misses_total",
+        "Callback results computed.",
+        "counter",
+        lambda: callback_cache.misses,
+    )
+)
+collector.add(
+    Collected(
+        "insight_callback_cache_entries",
+        "Callback results held in the cache.",
+        "gauge",
+        lambda: len(callback_cache),
+    )
+)
 
-    return values
 
+def data_version(dataset: Optional[str], *args) -> str:
+    return registry.version(dataset).spreadsheet_hash
 
-def to_decimal(s: str) -> Optional[Decimal]:
-    pattern = re.compile(r"(?P<paren>\()?(?P<numeral>(\d+,?)+(\.(\d+))?)")
-    if match := pattern.search(s):
-        groups = match.groupdict()
-        sign = -1 if groups["paren"] is not None else 1
-        numeral = groups["numeral"].replace(",", "")
-        return sign * Decimal(numeral)
-    else:
-        return None
 
+def dataset_scope(dataset: Optional[str], *args) -> Optional[str]:
+    return dataset
 
-def prepare_data(values: SheetData) -> pd.DataFrame:
-    headers = [s.strip() for s in values[0]]
-    rows = values[1:]
-    df = pd.DataFrame(rows, columns=headers)
-    df["DateTime"] = pd.to_datetime(df["Date"], format="%m/%d/%Y")
-    df["Product"] = df["Product"].str.strip()
-    df["Department"] = df["Department"].str.strip()
-    df["Sales"] = df["Sales"].apply(to_decimal)
-    df["COGS"] = df["COGS"].apply(to_decimal)
-    df["Profit"] = df["Profit"].apply(to_decimal)
-    df["Date"] = df["DateTime"].dt.date
-    df = df.sort_values(by=["DateTime"])
 
-    return df
+@app.callback(
+    Output("filter-options", "data"),
+    Output("department-filter", "value"),
+    Output("product-filter", "value"),
+    Output("date-range", "min_date_allowed"),
+    Output("date-range", "max_date_allowed"),
+    Output("date-range", "start_date"),
+    Output("date-range", "end_date"),
+    Output("data-version", "data"),
+    Input("dataset-selector", "value"),
+    Input("version-poll", "n_intervals"),
+    State("data-version", "data"),
+)
+def update_filter_options(
+    dataset: Optional[str],
+    n_intervals: Optional[int] = None,
+    shown_version: Optional[str] = None,
+) -> Tuple:
+    """Filter choices and the version token of the selected dataset.
 
+    Polls get no update until the data changes. Then the new token makes the
+    chart and table update, and the user's selections are kept. The filter
+    dropdowns are narrowed from the choices in the browser.
+    """
+    version = registry.version(dataset)
+    triggered = {t["prop_id"] for t in dash.callback_context.triggered}
+    switched = "dataset-selector.value" in triggered
+    if not switched and version.token == shown_version:
+        raise PreventUpdate
+    df = version.frame
+    first_date, last_date = date_bounds(df)
+    selection = None if switched else dash.no_update
+    return (
+        version.co_occurrence,
+        selection,
+        selection,
+        first_date,
+        last_date,
+        selection,
+        selection,
+        version.token,
+    )
 
-raw_data = fetch_data()
-df = prepare_data(raw_data)
 
-app = dash.Dash(
-    __name__,
-    external_stylesheets=[dbc.themes.MINTY],
-    prevent_initial_callbacks=True,
-    routes_pathname_prefix="/dashboard/",
+@app.callback(
+    Output("chart-container", "children"),
+    Output("table-container", "children"),
+    Output("render-mode", "data"),
+    Input("dataset-selector", "value"),
+    Input("data-version", "data"),
+    State("render-mode", "data"),
 )
-app.title = "Insight Analytics"
-set_layout(app, df)
+def update_content(
+    dataset: Optional[str], shown_version: Optional[str], shown_mode: Optional[str]
+) -> Tuple:
+    """The chart and table components for the selected version.
 
+    Server-rendered ones stay and update through their own callbacks. In
+    client mode each new version's rows replace the store's.
+    """
+    version = registry.version(dataset)
+    mode = render_mode(version)
+    if mode == SERVER and shown_mode == SERVER:
+        raise PreventUpdate
+    return chart_content(version, mode), table_content(version, mode), mode
 
-def apply_filters(
-    df: pd.DataFrame, department: Optional[str], product: Optional[str]
-) -> pd.DataFrame:
-    mask = pd.Series(True, index=df.index)
-    if department:
-        mask = mask & (df["Department"] == department)
-    if product:
-        mask = mask & (df["Product"] == product)
 
-    return df[mask]
+app.clientside_callback(
+    NARROW_FILTER_OPTIONS,
+    Output("department-filter", "options"),
+    Output("product-filter", "options"),
+    Input("filter-options", "data"),
+    Input("department-filter", "value"),
+    Input("product-filter", "value"),
+)
 
 
 @app.callback(
     Output("sales-table", "data"),
+    Output("sales-table", "page_count"),
+    Input("dataset-selector", "value"),
     Input("department-filter", "value"),
     Input("product-filter", "value"),
+    Input("sales-table", "page_current"),
+    Input("sales-table", "page_size"),
+    Input("sales-table", "sort_by"),
+    Input("sales-table", "filter_query"),
+    Input("data-version", "data"),
 )
+@memoize(callback_cache, data_version, dataset_scope)
 def update_table(
-    department: Optional[str], product: Optional[str]
-) -> List[Dict[str, Any]]:
-    return apply_filters(df, department, product).to_dict("records")
+    dataset: Optional[str],
+    department: Optional[str],
+    product: Optional[str],
+    page_current: Optional[int],
+    page_size: int,
+    sort_by: Optional[List[Dict[str, str]]],
+    filter_query: Optional[str],
+    shown_version: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], int]:
+    version = registry.version(dataset)
+    dff = apply_filters(version.frame, department, product, version.index)
+    record_rows(len(dff))
+    return table_page(dff, page_current, page_size, sort_by, filter_query)
 
 
 @app.callback(
-    Output("bar-chart", "figure"),
+    Output("chart-series", "data"),
+    Input("dataset-selector", "value"),
     Input("department-filter", "value"),
     Input("product-filter", "value"),
+    Input("granularity", "value"),
+    Input("date-range", "start_date"),
+    Input("date-range", "end_date"),
+    Input("data-version", "data"),
 )
+@memoize(callback_cache, data_version, dataset_scope)
 def update_bar_chart(
-    department: Optional[str], product: Optional[str]
-) -> List[Dict[str, Any]]:
-    dff = apply_filters(df, department, product)
-    return create_pnl_chart(monthly_totals(dff))
+    dataset: Optional[str],
+    department: Optional[str],
+    product: Optional[str],
+    granularity: str = "month",
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    shown_version: Optional[str] = None,
+) -> Dict[str, list]:
+    cube = registry.version(dataset).cube
+    return pnl_series(
+        cube.get(department, product, granularity or "month", start_date, end_date)
+    )
+
+
+app.clientside_callback(
+    APPLY_PNL_SERIES,
+    Output("bar-chart", "figure"),
+    Input("chart-series", "data"),
+    State("bar-chart", "figure"),
+)
+
+
+app.clientside_callback(
+    ClientsideFunction("insight", "pnl_chart"),
+    Output("client-bar-chart", "figure"),
+    Input("client-data", "data"),
+    Input("department-filter", "value"),
+    Input("product-filter", "value"),
+    Input("granularity", "value"),
+    Input("date-range", "start_date"),
+    Input("date-range", "end_date"),
+    State("client-bar-chart", "figure"),
+    prevent_initial_call=False,
+)
+
+
+app.clientside_callback(
+    ClientsideFunction("insight", "table_rows"),
+    Output("client-table", "data"),
+    Input("client-data", "data"),
+    Input("department-filter", "value"),
+    Input("product-filter", "value"),
+    prevent_initial_call=False,
+)
 
 
 @app.callback(
-    Output("download", "data"),
-    Input("download-button", "n_clicks"),
-    State("department-filter", "value"),
-    State("product-filter", "value"),
+    Output("download-button", "href"),
+    Output("download-parquet-button", "href"),
+    Input("dataset-selector", "value"),
+    Input("department-filter", "value"),
+    Input("product-filter", "value"),
 )
-def handle_download(n_clicks: int, department: Optional[str], product: Optional[str]):
-    dff = apply_filters(df, department, product)
-    dff = dff[[c["id"] for c in table_columns]]
-    filename = "-".join([s for s in ("Sales", department, product) if s])
-    return send_data_frame(dff.to_csv, f"{filename}.csv")
+def update_export_links(
+    dataset: Optional[str], department: Optional[str], product: Optional[str]
+) -> Tuple[str, str]:
+    return (
+        export_url("csv", department, product, dataset),
+        export_url("parquet", department, product, dataset),
+    )
 
 
 server = app.server
@@ -0,0 +1,135 @@
+// Chart and table of small datasets, computed in the browser from the rows
+// in the client-data store; see insight/clientside.py for the encoding.
+(function() {
+    var DAY_MS = 86400000;
+    var decoded = {version: null, rows: null};
+
+    function decode(data) {
+        if (decoded.version === data.version && decoded.rows) {
+            return decoded.rows;
+        }
+        var n = data.day_steps.length;
+        var days = new Int32Array(n);
+        var day = data.first_day;
+        for (var i = 0; i < n; i++) {
+            day += data.day_steps[i];
+            days[i] = day;
+        }
+        decoded = {version: data.version, rows: {
+            length: n,
+            days: days,
+            department: data.department,
+            product: data.product,
+            department_names: data.department_names,
+            product_names: data.product_names,
+            money: [data.sales, data.cogs, data.profit]
+        }};
+        return decoded.rows;
+    }
+
+    function toDay(value) {
+        var parts = value.slice(0, 10).split("-");
+        return Date.UTC(+parts[0], parts[1] - 1, +parts[2]) / DAY_MS;
+    }
+
+    function isoDate(day) {
+        return new Date(day * DAY_MS).toISOString().slice(0, 10);
+    }
+
+    // The last day of the bucket holding `day`, as pandas labels them:
+    // weeks end on Sunday, the others on the last day of the period.
+    function bucketEnd(day, granularity) {
+        if (granularity === "week") {
+            return day + (7 - new Date(day * DAY_MS).getUTCDay()) % 7;
+        }
+        var date = new Date(day * DAY_MS);
+        var year = date.getUTCFullYear();
+        var month = date.getUTCMonth();
+        var next = {month: month + 1, quarter: 3 * Math.floor(month / 3) + 3, year: 12};
+        return Date.UTC(year, next[granularity], 0) / DAY_MS;
+    }
+
+    // Positions of the rows matching the filters, in date order.
+    function select(rows, department, product, start, end) {
+        var d = department ? rows.department_names.indexOf(department) : -1;
+        var p = product ? rows.product_names.indexOf(product) : -1;
+        var first = start ? toDay(start) : -Infinity;
+        var last = end ? toDay(end) : Infinity;
+        var positions = [];
+        for (var i = 0; i < rows.length; i++) {
+            if ((department && rows.department[i] !== d) ||
+                (product && rows.product[i] !== p) ||
+                rows.days[i] < first || rows.days[i] > last) {
+                continue;
+            }
+            positions.push(i);
+        }
+        return positions;
+    }
+
+    // The x/y arrays of the P&L chart, as pnl_series() gives them.
+    function pnlSeries(rows, positions, granularity) {
+        var totals = {};
+        var labels = [];
+        positions.forEach(function(i) {
+            var label = bucketEnd(rows.days[i], granularity);
+            if (!totals[label]) {
+                totals[label] = [0, 0, 0];
+                labels.push(label);
+            }
+            for (var m = 0; m < 3; m++) {
+                totals[label][m] += rows.money[m][i];
+            }
+        });
+        var x = [];
+        var y = [[], [], []];
+        if (labels.length) {
+            var last = Math.max.apply(null, labels);
+            for (var label = Math.min.apply(null, labels); label <= last;
+                 label = bucketEnd(label + 1, granularity)) {
+                var sums = totals[label] || [0, 0, 0];
+                x.push(isoDate(label));
+                for (var m = 0; m < 3; m++) {
+                    y[m].push(sums[m] / 100);
+                }
+            }
+        }
+        return {x: x, y: y};
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        insight: {
+            pnl_chart: function(data, department, product, granularity, start, end, figure) {
+                if (!data || !figure) {
+                    return window.dash_clientside.no_update;
+                }
+                var rows = decode(data);
+                var series = pnlSeries(
+                    rows, select(rows, department, product, start, end),
+                    granularity || "month"
+                );
+                var traces = figure.data.map(function(trace, i) {
+                    return Object.assign({}, trace, {x: series.x, y: series.y[i]});
+                });
+                return Object.assign({}, figure, {data: traces});
+            },
+
+            table_rows: function(data, department, product) {
+                if (!data) {
+                    return window.dash_clientside.no_update;
+                }
+                var rows = decode(data);
+                return select(rows, department, product).map(function(i) {
+                    return {
+                        Date: isoDate(rows.days[i]),
+                        Department: rows.department_names[rows.department[i]],
+                        Product: rows.product_names[rows.product[i]],
+                        Sales: rows.money[0][i] / 100,
+                        COGS: rows.money[1][i] / 100,
+                        Profit: rows.money[2][i] / 100
+                    };
+                });
+            }
+        }
+    });
+})();
@@ -1,14 +1,104 @@
 # auth.py
 
+import functools
+import hmac
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
 from flask import Blueprint, render_template, redirect, url_for, request, flash
+from flask import abort, current_app
 from werkzeug.security import generate_password_hash, check_password_hash
-from flask_login import login_user, logout_user, login_required
+from flask_login import UserMixin, login_user, logout_user, login_required
+from flask_login import current_user
+from sqlalchemy import event
 from .models import User
 from . import db
 
 auth = Blueprint("auth", __name__)
 
 
+class Principal(UserMixin):
+    "The signed-in user as seen by request handlers, detached from any session."
+
+    def __init__(self, id: int, email: str, name: str) -> None:
+        self.id = id
+        self.email = email
+        self.name = name
+
+
+class UserCache:
+    """Principals by user id, kept for `ttl` seconds.
+
+    Lets `login_required` views, including every Dash callback, skip the user
+    query. Entries are dropped when this process changes the user; changes
+    made by other processes show up once the entry expires.
+    """
+
+    def __init__(self, ttl: float = 60.0) -> None:
+        self.ttl = ttl
+        self._entries: Dict[int, Tuple[float, Optional[Principal]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[Principal]:
+        now = time.monotonic()
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+
+        user = User.query.get(user_id)
+        principal = user and Principal(user.id, user.email, user.name)
+        with self._lock:
+            if len(self._entries) > 10_000:
+                self._entries = {k: v for k, v in self._entries.items() if v[0] > now}
+            self._entries[user_id] = (now + self.ttl, principal)
+        return principal
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+user_cache = UserCache()
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_user(mapper, connection, target) -> None:
+    user_cache.invalidate(target.id)
+
+
+def find_user(email: Optional[str]) -> Optional[User]:
+    "Look up a user by email, ignoring case, using the lower(email) index."
+    if not email:
+        return None
+    return User.query.filter(db.func.lower(User.email) == email.lower()).first()
+
+
+def authenticated(token_setting: str):
+    """Let a view accept a signed-in session, or the `token_setting` setting
+    sent as `Authorization: Bearer <token>` by schedulers and scrapers.
+    """
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            config = current_app.config
+            token = config[token_setting]
+            sent = request.headers.get("Authorization", "").encode()
+            if not (
+                config.get("LOGIN_DISABLED")
+                or current_user.is_authenticated
+                or (token and hmac.compare_digest(sent, f"Bearer {token}".encode()))
+            ):
+                abort(401)
+            return view(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
 @auth.route("/login")
 def login():
     return render_template("login.html")
@@ -20,7 +110,7 @@ def login_post():
     password = request.form.get("password")
     remember = True if request.form.get("remember") else False
 
-    user = User.query.filter_by(email=email).first()
+    user = find_user(email)
 
     # check if user actually exists
     # take the user supplied password, hash it, and compare it to the hashed password in database
@@ -47,9 +137,9 @@ def signup_post():
     name = request.form.get("name")
     password = request.form.get("password")
 
-    user = User.query.filter_by(
-        email=email
-    ).first()  # if this returns a user, then the email already exists in database
+    user = find_user(
+        email
+    )  # if this returns a user, then the email already exists in database
 
     if (
         user
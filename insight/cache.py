@@ -0,0 +1,98 @@
+import functools
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable
+
+
+class CallbackCache:
+    """A bounded LRU cache of callback results, tagged by data version.
+
+    Shared by all threads of a worker. Concurrent misses on the same key wait
+    for a single computation. Each scope, e.g. a dataset, has its own version
+    token; a new token drops that scope's entries.
+    """
+
+    def __init__(self, maxsize: int = 256) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._tokens: Dict[Hashable, str] = {}
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._pending: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_compute(
+        self,
+        token: str,
+        key: Hashable,
+        compute: Callable[[], Any],
+        scope: Hashable = None,
+    ):
+        key = (scope, key)
+        with self._lock:
+            if token != self._tokens.get(scope):
+                self._tokens[scope] = token
+                for stale in [k for k in self._entries if k[0] == scope]:
+                    del self._entries[stale]
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            self.misses += 1
+            future = self._pending.get(key)
+            computing = future is None
+            if computing:
+                future = self._pending[key] = Future()
+
+        if not computing:
+            return future.result()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._pending[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._pending[key]
+            # A refresh may have landed meanwhile; don't cache under the new one
+            if token == self._tokens.get(scope):
+                self._entries[key] = value
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        future.set_result(value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def memoize(
+    cache: CallbackCache,
+    token: Callable[..., str],
+    scope: Callable[..., Hashable] = lambda *args: None,
+):
+    """Cache a callback's results by data version token and JSON-able arguments.
+
+    `token` and `scope` are called with the callback's arguments.
+    """
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args):
+            key = (fn.__name__, json.dumps(args, sort_keys=True, default=str))
+            return cache.get_or_compute(
+                token(*args), key, lambda: fn(*args), scope(*args)
+            )
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,53 @@
+"""Clientside rendering of small datasets.
+
+Datasets of up to `CLIENTSIDE_MAX_ROWS` rows are sent to the browser once
+per version, as compact columns in a `dcc.Store`. The chart and table are
+then filtered, bucketed, paged and sorted by the functions in
+`assets/clientside.js`, without requests to the server. Larger datasets keep
+the server-side callbacks.
+"""
+from typing import Any, Dict
+
+import numpy as np
+from flask import current_app, has_app_context
+
+from .data import MONEY_COLUMNS
+from .sync import DataVersion
+
+SERVER = "server"
+CLIENT = "client"
+
+
+def render_mode(version: DataVersion) -> str:
+    "Where the chart and table of a version are computed."
+    if not has_app_context():
+        return SERVER
+    max_rows = current_app.config["CLIENTSIDE_MAX_ROWS"]
+    rows = len(version.frame)
+    return CLIENT if 0 < rows <= max_rows else SERVER
+
+
+def client_payload(version: DataVersion) -> Dict[str, Any]:
+    """The rows of a version in the encoding `clientside.js` decodes.
+
+    Department and Product are category codes into lists of names, money is
+    integer cents, and dates are the days between consecutive rows, which
+    the frame's date order keeps small and which gzip well.
+    """
+    df = version.frame
+    dated = df["DateTime"].notna()
+    if not dated.all():
+        # Blank sheet rows have no date to encode, and no chart bucket
+        df = df[dated]
+    days = df["DateTime"].to_numpy().astype("datetime64[D]").astype(np.int64)
+    payload: Dict[str, Any] = {
+        "version": version.token,
+        "first_day": int(days[0]) if len(days) else 0,
+        "day_steps": np.diff(days, prepend=days[:1]).tolist(),
+    }
+    for column, key in [("Department", "department"), ("Product", "product")]:
+        payload[f"{key}_names"] = df[column].cat.categories.tolist()
+        payload[key] = df[column].cat.codes.tolist()
+    for column in MONEY_COLUMNS:
+        payload[column.lower()] = df[column].tolist()
+    return payload
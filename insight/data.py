@@ -0,0 +1,282 @@
+import functools
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional
+
+import numpy as np
+import pandas as pd
+
+SheetData = List[List[str]]
+
+COLUMNS = ["Date", "Department", "Product", "Sales", "COGS", "Profit"]
+MONEY_COLUMNS = ["Sales", "COGS", "Profit"]
+# Columns of prepared frames. The sheet's Date is only derived from DateTime
+# for display and export; see sheet_rows().
+FRAME_COLUMNS = ["DateTime", "Department", "Product"] + MONEY_COLUMNS
+DATE_FORMAT = "%m/%d/%Y"
+
+# Money is held as int64 cents so sums stay exact; see to_dollars().
+CENTS = 100
+PARSE_CHUNK_ROWS = 1 << 20
+
+# Sheets are read in blocks of rows, a few at a time, which keeps each
+# response well under the API's size limits without spending too many of the
+# per-minute read quota on one sheet.
+FETCH_BLOCK_ROWS = 100_000
+FETCH_WORKERS = 4
+SHEETS_SCOPES = ["https://www.googleapis.com/auth/spreadsheets.readonly"]
+
+
+@functools.lru_cache(maxsize=None)
+def sheets_service() -> Any:
+    """The Sheets API client, built once per process.
+
+    httplib2 connections aren't thread-safe, so each thread sends its requests
+    over its own authorized connection.
+    """
+    import google.auth
+    import google_auth_httplib2
+    import httplib2
+    from googleapiclient import discovery
+    from googleapiclient.http import HttpRequest
+
+    credentials, _ = google.auth.default(scopes=SHEETS_SCOPES)
+    connections = threading.local()
+
+    def build_request(http, *args, **kwargs):
+        if not hasattr(connections, "http"):
+            connections.http = google_auth_httplib2.AuthorizedHttp(
+                credentials, http=httplib2.Http()
+            )
+        return HttpRequest(connections.http, *args, **kwargs)
+
+    return discovery.build(
+        "sheets",
+        "v4",
+        credentials=credentials,
+        requestBuilder=build_request,
+        cache_discovery=False,
+    )
+
+
+def fetch_data(
+    spreadsheet_id: str,
+    range_name: str,
+    service: Any = None,
+    block_rows: int = FETCH_BLOCK_ROWS,
+    workers: int = FETCH_WORKERS,
+) -> SheetData:
+    """Read a sheet's values, fetching blocks of rows concurrently.
+
+    `range_name` is the sheet's title; A1 ranges such as "Data!A1:F" are
+    read in a single request.
+    """
+    service = service or sheets_service()
+    sheets = service.spreadsheets()
+    if "!" in range_name:
+        blocks = [_fetch_range(sheets, spreadsheet_id, range_name)]
+    else:
+        metadata = sheets.get(
+            spreadsheetId=spreadsheet_id,
+            ranges=[range_name],
+            fields="sheets.properties.gridProperties.rowCount",
+        ).execute()
+        row_count = metadata["sheets"][0]["properties"]["gridProperties"]["rowCount"]
+        title = "'{}'".format(range_name.replace("'", "''"))
+        ranges = [
+            f"{title}!{start + 1}:{min(start + block_rows, row_count)}"
+            for start in range(0, row_count, block_rows)
+        ]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            blocks = list(
+                pool.map(lambda r: _fetch_range(sheets, spreadsheet_id, r), ranges)
+            )
+        # The API drops empty rows at the end of each range; put back those
+        # that are followed by data in a later block.
+        last = max((i for i, block in enumerate(blocks) if block), default=0)
+        for block in blocks[:last]:
+            block.extend([] for _ in range(block_rows - len(block)))
+
+    values = [row for block in blocks for row in block]
+    if not values:
+        raise RuntimeError("No data found")
+
+    return values
+
+
+def _fetch_range(sheets: Any, spreadsheet_id: str, range_name: str) -> SheetData:
+    result = sheets.values().get(spreadsheetId=spreadsheet_id, range=range_name)
+    return result.execute().get("values", [])
+
+
+def fetch_local_data(path: Optional[str] = None) -> SheetData:
+    """Offline stand-in for `fetch_data`.
+
+    Reads sheet values from a JSON file, or generates sample rows when no path
+    is given.
+    """
+    if path is None:
+        from .fakes import synthetic_values
+
+        return synthetic_values(1000)
+    with open(path) as f:
+        values = json.load(f)
+    if not values:
+        raise RuntimeError("No data found")
+
+    return values
+
+
+def spreadsheet_hash(values: SheetData) -> str:
+    "Content digest of a sheet payload, as stored in `Dataset.spreadsheet_hash`."
+    payload = json.dumps(values, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def parse_money(column: pd.Series) -> pd.Series:
+    """Parse formatted amounts such as "$ (1,234.56)" into int64 cents.
+
+    Parentheses or a leading minus mark negatives; blanks and "$ -" are zero.
+    """
+    text = column.fillna("").astype(str)
+    try:
+        raw = text.to_numpy().astype("S")
+    except UnicodeEncodeError:
+        raw = text.str.encode("ascii", errors="ignore").to_numpy().astype("S")
+    cents = np.empty(len(raw), dtype=np.int64)
+    for start in range(0, len(raw), PARSE_CHUNK_ROWS):
+        stop = start + PARSE_CHUNK_ROWS
+        cents[start:stop] = _parse_money_bytes(raw[start:stop])
+
+    return pd.Series(cents, index=column.index, name=column.name)
+
+
+def _parse_money_bytes(raw: np.ndarray) -> np.ndarray:
+    # View the fixed-width byte strings as a rows x characters matrix and
+    # accumulate the digits column by column, so no Python code runs per cell.
+    width = raw.dtype.itemsize
+    chars = raw.view(np.uint8).reshape(len(raw), width)
+    digits = chars - np.uint8(ord("0"))
+    is_digit = digits < 10  # characters below "0" wrap around
+    after_point = np.logical_or.accumulate(chars == ord("."), axis=1)
+    before_digits = ~np.logical_or.accumulate(is_digit, axis=1)
+
+    whole = np.zeros(len(raw), dtype=np.int64)
+    for j in range(width):
+        whole = np.where(is_digit[:, j], whole * 10 + digits[:, j], whole)
+
+    places = (is_digit & after_point).sum(axis=1)
+    scale = 10 ** np.abs(places - 2)
+    cents = np.where(
+        places <= 2, whole * scale, (whole + scale // 2) // np.maximum(scale, 1)
+    )
+    negative = ((chars == ord("(")) | ((chars == ord("-")) & before_digits)).any(axis=1)
+    return np.where(negative, -cents, cents)
+
+
+def to_dollars(df: pd.DataFrame) -> pd.DataFrame:
+    "Convert the money columns from cents to dollars for display and export."
+    money = df[MONEY_COLUMNS] / CENTS
+    return df.assign(**{c: money[c] for c in MONEY_COLUMNS})
+
+
+def sheet_rows(df: pd.DataFrame) -> pd.DataFrame:
+    "Prepared rows in the sheet's columns, with money in dollars."
+    return to_dollars(df).assign(Date=df["DateTime"].dt.date)[COLUMNS]
+
+
+def prepare_data(values: SheetData) -> pd.DataFrame:
+    """Parse sheet values into a frame of FRAME_COLUMNS, sorted by date.
+
+    Rows keep their position in the sheet as their index, and rows of the
+    same day keep their order. Each column is parsed once and then taken in
+    date order, so the frame isn't copied again to sort it.
+    """
+    headers = [s.strip() for s in values[0]]
+    raw = pd.DataFrame(values[1:], columns=headers)
+    dates = _parse_dates(raw["Date"]).to_numpy()
+    order = np.argsort(dates, kind="stable")
+    columns = {
+        "DateTime": dates[order],
+        "Department": _categorical(raw["Department"]).take(order),
+        "Product": _categorical(raw["Product"]).take(order),
+    }
+    for column in MONEY_COLUMNS:
+        columns[column] = parse_money(raw[column]).to_numpy()[order]
+
+    return pd.DataFrame(columns, index=raw.index[order])
+
+
+def prepare_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Prepare the sheet columns of a frame read from a file.
+
+    Unlike `prepare_data`, columns may already be typed: dates as strings or
+    timestamps, amounts as numbers or formatted strings. Other columns are
+    dropped, and rows keep their index and order.
+    """
+    df = df.rename(columns=lambda c: str(c).strip())
+    missing = [c for c in COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError("Missing columns: {}".format(", ".join(missing)))
+
+    prepared = pd.DataFrame(index=df.index)
+    prepared["DateTime"] = _parse_dates(df["Date"])
+    for column in ("Department", "Product"):
+        prepared[column] = _categorical(df[column].fillna("").astype(str))
+    for column in MONEY_COLUMNS:
+        prepared[column] = _to_cents(df[column])
+
+    return prepared
+
+
+def _parse_dates(column: pd.Series) -> pd.Series:
+    "Parse dates, each distinct value once; a sheet has far fewer days than rows."
+    if pd.api.types.is_datetime64_any_dtype(column):
+        return column
+    codes, uniques = pd.factorize(column)
+    try:
+        parsed = pd.to_datetime(uniques, format=DATE_FORMAT)
+    except (TypeError, ValueError):
+        parsed = pd.to_datetime(uniques)
+    # Missing values have code -1, which picks the NaT appended last
+    days = np.append(parsed.to_numpy(), np.datetime64("NaT", "ns"))
+    return pd.Series(days[codes], index=column.index, name=column.name)
+
+
+def _categorical(column: pd.Series) -> pd.Categorical:
+    "Strings with surrounding spaces stripped, as a categorical."
+    codes, uniques = pd.factorize(column)
+    stripped = pd.Categorical(pd.Series(uniques, dtype=object).str.strip())
+    codes = np.append(stripped.codes, -1)[codes]
+    return pd.Categorical.from_codes(codes, stripped.categories)
+
+
+def _to_cents(column: pd.Series) -> pd.Series:
+    if pd.api.types.is_integer_dtype(column):
+        return column.astype(np.int64) * CENTS
+    if pd.api.types.is_float_dtype(column):
+        return (column.fillna(0) * CENTS).round().astype(np.int64)
+    return parse_money(column)
+
+
+def concat_frames(*frames: pd.DataFrame) -> pd.DataFrame:
+    "Append prepared frames, keeping Department and Product categorical."
+    categories = {
+        c: functools.reduce(
+            lambda a, b: a.union(b), (df[c].cat.categories for df in frames)
+        )
+        for c in ("Department", "Product")
+    }
+    return pd.concat(
+        [
+            df.assign(**{c: df[c].cat.set_categories(v) for c, v in categories.items()})
+            for df in frames
+        ]
+    )
+
+
+def empty_frame() -> pd.DataFrame:
+    "A prepared frame with no rows, served until the first dataset is loaded."
+    return prepare_data([COLUMNS])
@@ -0,0 +1,43 @@
+"""Dataset versions and on-demand refreshes, for dashboards and automation.
+
+Both routes take an optional `dataset` name, defaulting to the first. They
+accept a signed-in session, or `Authorization: Bearer <REFRESH_TOKEN>` so a
+scheduler or a sheet's change webhook can trigger a refresh.
+"""
+from typing import Optional
+
+from flask import Blueprint, abort, jsonify, request
+
+from .auth import authenticated
+from .registry import registry
+
+datasets = Blueprint("datasets", __name__)
+
+
+def _dataset_name() -> str:
+    name: Optional[str] = request.args.get("dataset") or registry.default
+    if name not in registry.names:
+        abort(404)
+    return name
+
+
+@datasets.route("/datasets/version")
+@authenticated("REFRESH_TOKEN")
+def version():
+    name = _dataset_name()
+    current = registry.version(name)
+    return jsonify(
+        dataset=name,
+        version=current.token,
+        loaded_at=current.loaded_at.isoformat() + "Z",
+    )
+
+
+@datasets.route("/datasets/refresh", methods=["POST"])
+@authenticated("REFRESH_TOKEN")
+def refresh():
+    "Start fetching a dataset in the background, and return at once."
+    name = _dataset_name()
+    scheduled = registry.schedule_refresh(name)
+    # Poll /datasets/version for the new version
+    return jsonify(dataset=name, scheduled=scheduled), 202
@@ -0,0 +1,112 @@
+"Streaming exports of the filtered sales rows."
+import io
+from typing import Iterator, Optional
+from urllib.parse import urlencode
+
+from flask import Blueprint, Response, abort, request
+import pandas as pd
+
+from .data import COLUMNS, MONEY_COLUMNS, sheet_rows
+from .filters import apply_filters
+from .registry import registry
+
+export = Blueprint("export", __name__)
+
+EXPORT_CHUNK_ROWS = 50_000
+
+
+def export_url(
+    fmt: str,
+    department: Optional[str] = None,
+    product: Optional[str] = None,
+    dataset: Optional[str] = None,
+) -> str:
+    params = (("dataset", dataset), ("department", department), ("product", product))
+    query = urlencode({k: v for k, v in params if v})
+    return f"/export/{fmt}?{query}" if query else f"/export/{fmt}"
+
+
+def export_filename(department: Optional[str], product: Optional[str]) -> str:
+    return "-".join([s for s in ("Sales", department, product) if s])
+
+
+def iter_chunks(
+    df: pd.DataFrame, chunk_rows: int = EXPORT_CHUNK_ROWS
+) -> Iterator[pd.DataFrame]:
+    for start in range(0, len(df), chunk_rows):
+        yield sheet_rows(df.iloc[start : start + chunk_rows])
+
+
+def iter_csv(df: pd.DataFrame, chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[str]:
+    yield ",".join(COLUMNS) + "\n"
+    for chunk in iter_chunks(df, chunk_rows):
+        yield chunk.to_csv(index=False, header=False)
+
+
+class _ChunkSink(io.RawIOBase):
+    "A write-only file that hands back what was written since the last drain."
+
+    def __init__(self) -> None:
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        self._position += len(b)
+        return len(b)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def iter_parquet(
+    df: pd.DataFrame, chunk_rows: int = EXPORT_CHUNK_ROWS
+) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = _ChunkSink()
+    schema = pa.schema(
+        [("Date", pa.date32()), ("Department", pa.string()), ("Product", pa.string())]
+        + [(column, pa.float64()) for column in MONEY_COLUMNS]
+    )
+    with pq.ParquetWriter(sink, schema) as writer:
+        # One row group per chunk, sent as soon as it is written
+        for chunk in iter_chunks(df, chunk_rows):
+            writer.write_table(
+                pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            )
+            yield sink.drain()
+    yield sink.drain()
+
+
+@export.route("/export/<fmt>")
+def download(fmt: str):
+    department = request.args.get("department") or None
+    product = request.args.get("product") or None
+    try:
+        version = registry.version(request.args.get("dataset") or None)
+    except KeyError:
+        abort(404)
+    dff = apply_filters(version.frame, department, product, version.index)
+    filename = export_filename(department, product)
+
+    if fmt == "csv":
+        body, mimetype = iter_csv(dff), "text/csv"
+    elif fmt == "parquet":
+        body, mimetype = iter_parquet(dff), "application/vnd.apache.parquet"
+    else:
+        abort(404)
+
+    return Response(
+        body,
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
@@ -0,0 +1,119 @@
+"Offline stand-ins for Google Sheets, for local development, tests and benchmarks."
+import random
+import re
+import threading
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+from .data import COLUMNS, SheetData
+
+DEPARTMENTS = ["Hardware", "Software", "Services", "Training", "Support"]
+PRODUCTS = ["Alpha", "Bravo", "Charlie", "Delta", "Echo", "Foxtrot", "Golf"]
+
+
+def format_money(amount: float) -> str:
+    "Format an amount the way the sheet's accounting format renders it."
+    text = f"{abs(amount):,.2f}"
+    return f"$ ({text})" if amount < 0 else f"$ {text}"
+
+
+def synthetic_values(
+    rows: int, seed: int = 0, start: date = date(2018, 1, 1)
+) -> SheetData:
+    'Generate sheet values in the same shape as the "Financial Data" sheet.'
+    rng = random.Random(seed)
+    values = [list(COLUMNS)]
+    for _ in range(rows):
+        day = start + timedelta(days=rng.randrange(3 * 365))
+        sales = round(rng.uniform(100, 50_000), 2)
+        cogs = round(sales * rng.uniform(0.3, 1.2), 2)
+        values.append(
+            [
+                day.strftime("%m/%d/%Y"),
+                rng.choice(DEPARTMENTS),
+                rng.choice(PRODUCTS),
+                format_money(sales),
+                format_money(cogs),
+                format_money(sales - cogs),
+            ]
+        )
+    return values
+
+
+class FakeSheetsService:
+    """Serves sheet values through the parts of the Sheets API client that
+    `fetch_data` uses, e.g. `fetch_data(id, "Financial Data", service=fake)`.
+
+    Each request takes `latency` seconds plus `row_latency` per row returned,
+    and a range of more than `max_response_rows` rows fails as an oversized
+    response would.
+    """
+
+    def __init__(
+        self,
+        values: SheetData,
+        latency: float = 0.0,
+        row_latency: float = 0.0,
+        max_response_rows: Optional[int] = None,
+        row_count: Optional[int] = None,
+    ) -> None:
+        self.sheet_values = values
+        self.latency = latency
+        self.row_latency = row_latency
+        self.max_response_rows = max_response_rows
+        # Sheets usually have empty rows below the data
+        self.row_count = row_count or len(values) + 100
+        self.ranges: List[str] = []
+        self._lock = threading.Lock()
+
+    def spreadsheets(self) -> "FakeSheetsService":
+        return self
+
+    def values(self) -> "_FakeValues":
+        return _FakeValues(self)
+
+    def get(self, spreadsheetId: str, ranges: List[str], fields: str) -> "_Request":
+        grid = {"gridProperties": {"rowCount": self.row_count}}
+        return _Request(self, {"sheets": [{"properties": grid}]})
+
+    def read(self, range_name: str) -> Dict[str, Any]:
+        with self._lock:
+            self.ranges.append(range_name)
+        match = re.search(r"!(\d+):(\d+)$", range_name)
+        if match:
+            start, stop = int(match.group(1)) - 1, int(match.group(2))
+        else:
+            start, stop = 0, self.row_count
+        stop = min(stop, len(self.sheet_values))
+        # Like the API, leave out empty rows at the end of the range
+        while stop > start and not self.sheet_values[stop - 1]:
+            stop -= 1
+        rows = self.sheet_values[start:stop]
+        if self.max_response_rows and len(rows) > self.max_response_rows:
+            raise RuntimeError(f"Response too large: {range_name}")
+        time.sleep(self.row_latency * len(rows))
+        return {"range": range_name, "values": rows} if rows else {}
+
+
+class _FakeValues:
+    def __init__(self, service: FakeSheetsService) -> None:
+        self.service = service
+
+    def get(self, spreadsheetId: str, range: str) -> "_Request":
+        return _Request(self.service, None, range)
+
+
+class _Request:
+    def __init__(
+        self, service: FakeSheetsService, result: Any, range_name: str = ""
+    ) -> None:
+        self.service = service
+        self.result = result
+        self.range_name = range_name
+
+    def execute(self) -> Any:
+        time.sleep(self.service.latency)
+        if self.result is not None:
+            return self.result
+        return self.service.read(self.range_name)
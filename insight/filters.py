@@ -0,0 +1,105 @@
+import copy
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+FilterKey = Tuple[Optional[str], Optional[str]]
+
+
+class FilterIndex:
+    """Row positions for each department, product and (department, product).
+
+    Positions are kept in ascending order, so the selected rows come out in
+    the frame's date order. Built once per data version.
+    """
+
+    def __init__(self, df: pd.DataFrame) -> None:
+        dtype = np.int32 if len(df) < np.iinfo(np.int32).max else np.int64
+        pairs = df.groupby(["Department", "Product"], observed=True, sort=False)
+        self._rows: Dict[FilterKey, np.ndarray] = {
+            key: rows.astype(dtype) for key, rows in pairs.indices.items()
+        }
+
+        by_department = defaultdict(list)
+        by_product = defaultdict(list)
+        for (department, product), rows in self._rows.items():
+            by_department[department].append(rows)
+            by_product[product].append(rows)
+        for department, parts in by_department.items():
+            self._rows[(department, None)] = np.sort(np.concatenate(parts))
+        for product, parts in by_product.items():
+            self._rows[(None, product)] = np.sort(np.concatenate(parts))
+
+    def extend(self, other: "FilterIndex", offset: int) -> "FilterIndex":
+        "The index after appending the rows `other` was built from at `offset`."
+        extended = copy.copy(self)
+        extended._rows = dict(self._rows)
+        for key, rows in other._rows.items():
+            rows = rows + rows.dtype.type(offset)
+            if key in self._rows:
+                rows = np.concatenate([self._rows[key], rows])
+            extended._rows[key] = rows
+        return extended
+
+    def co_occurrence(self) -> Dict[str, Any]:
+        """Row counts per department, product and pair, to narrow each dropdown
+        to the choices that go with the other's selection.
+
+        Names are listed in the order they first appear in the frame. The
+        result is plain JSON, for a `dcc.Store`.
+        """
+        departments: Dict[str, np.ndarray] = {}
+        products: Dict[str, np.ndarray] = {}
+        department_products: Dict[str, Dict[str, int]] = defaultdict(dict)
+        product_departments: Dict[str, Dict[str, int]] = defaultdict(dict)
+        for (department, product), rows in self._rows.items():
+            if product is None:
+                departments[department] = rows
+            elif department is None:
+                products[product] = rows
+            else:
+                department_products[department][product] = len(rows)
+                product_departments[product][department] = len(rows)
+
+        def in_order(groups: Dict[str, np.ndarray]) -> List[str]:
+            return sorted(groups, key=lambda name: groups[name][0])
+
+        return {
+            "departments": in_order(departments),
+            "products": in_order(products),
+            "department_counts": {k: len(v) for k, v in departments.items()},
+            "product_counts": {k: len(v) for k, v in products.items()},
+            "department_products": dict(department_products),
+            "product_departments": dict(product_departments),
+        }
+
+    def rows(
+        self, department: Optional[str], product: Optional[str]
+    ) -> Optional[np.ndarray]:
+        "Positions of the matching rows, or None when nothing is filtered."
+        if not department and not product:
+            return None
+        return self._rows.get(
+            (department or None, product or None), np.empty(0, dtype=np.int64)
+        )
+
+
+def apply_filters(
+    df: pd.DataFrame,
+    department: Optional[str],
+    product: Optional[str],
+    index: Optional[FilterIndex] = None,
+) -> pd.DataFrame:
+    if index is not None:
+        rows = index.rows(department, product)
+        return df if rows is None else df.take(rows)
+
+    mask = pd.Series(True, index=df.index)
+    if department:
+        mask = mask & (df["Department"] == department)
+    if product:
+        mask = mask & (df["Product"] == product)
+
+    return df[mask]
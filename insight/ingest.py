@@ -0,0 +1,67 @@
+import hashlib
+import json
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+from .data import SheetData, prepare_data
+
+BLOCK_ROWS = 4096
+
+
+def block_hash(rows: SheetData) -> bytes:
+    payload = json.dumps(rows, separators=(",", ":")).encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+
+def block_hashes(rows: SheetData, block_rows: int = BLOCK_ROWS) -> List[bytes]:
+    return [
+        block_hash(rows[start : start + block_rows])
+        for start in range(0, len(rows), block_rows)
+    ]
+
+
+class IncrementalIngest:
+    """Parses only the rows of a sheet that changed since the last fetch.
+
+    Data rows are hashed in blocks; leading blocks whose hashes match the
+    previous fetch are already in the served frame and aren't parsed again.
+    The previous fetch's last, partial block is compared over the rows it had,
+    so for an append-only ledger exactly the new rows are parsed.
+    """
+
+    def __init__(self, block_rows: int = BLOCK_ROWS) -> None:
+        self.block_rows = block_rows
+        self.digest: Optional[str] = None
+        self._headers: Optional[List[str]] = None
+        self._blocks: List[bytes] = []
+        self._rows = 0
+
+    def ingest(
+        self, values: SheetData, digest: str, base_digest: str
+    ) -> Tuple[int, pd.DataFrame]:
+        """Parse what changed in `values` relative to the version `base_digest`.
+
+        Returns how many leading data rows are unchanged, and the rest of the
+        rows prepared, indexed by their position in the sheet.
+        """
+        headers, rows = values[0], values[1:]
+        prefix = 0
+        if base_digest == self.digest and headers == self._headers:
+            for old in self._blocks:
+                stop = min(prefix + self.block_rows, self._rows)
+                if stop > len(rows) or block_hash(rows[prefix:stop]) != old:
+                    break
+                prefix = stop
+        full_blocks = prefix // self.block_rows
+        blocks = self._blocks[:full_blocks] + block_hashes(
+            rows[full_blocks * self.block_rows :], self.block_rows
+        )
+
+        tail = prepare_data([headers] + rows[prefix:])
+        tail.index += prefix
+        self.digest = digest
+        self._headers = headers
+        self._blocks = blocks
+        self._rows = len(rows)
+        return prefix, tail
@@ -3,11 +3,21 @@ from dash_table import DataTable, FormatTemplate
 import dash_core_components as dcc
 import dash_bootstrap_components as dbc
 import dash_html_components as html
-from dash_extensions import Download
+from flask import current_app, has_app_context
 import pandas as pd
-import plotly.express as px
+from plotly.colors import qualitative
 import plotly.graph_objects as go
-from typing import List, Dict
+import plotly.io as pio
+from typing import Any, Callable, List, Dict, Optional, Tuple
+
+from .aggregates import GRANULARITIES
+from .clientside import CLIENT, client_payload, render_mode
+from .data import to_dollars
+from .export import export_url
+from .sync import DataVersion
+from .table import table_page
+
+PAGE_SIZE = 20
 
 money = FormatTemplate.money(2)
 table_columns: List[Dict[str, str]] = [
@@ -20,48 +30,235 @@ table_columns: List[Dict[str, str]] = [
 ]
 
 
-def create_pnl_chart(df: pd.DataFrame) -> go.Figure:
-    fig = go.Figure(
-        data=[
-            go.Bar(name="Sales", x=df["DateTime"], y=df["Sales"]),
-            go.Bar(name="COGS", x=df["DateTime"], y=df["COGS"]),
-            go.Scatter(
-                name="Profit",
-                x=df["DateTime"],
-                y=df["Profit"],
-                line=dict(color="darkslategrey", width=1.5),
-                marker=dict(size=5),
-                mode="lines+markers",
-            ),
-        ]
-    )
-    fig.update_layout(
-        dict(
-            title="P&L Trend",
-            colorway=px.colors.qualitative.Set2,
-        )
-    )
-    return fig
+# Built and validated once; figures are then assembled from plain dicts.
+PNL_LAYOUT = go.Layout(
+    title="P&L Trend",
+    colorway=qualitative.Set2,
+    template=pio.templates[pio.templates.default],
+).to_plotly_json()
+PNL_TRACES = [
+    {"type": "bar", "name": "Sales"},
+    {"type": "bar", "name": "COGS"},
+    {
+        "type": "scatter",
+        "name": "Profit",
+        "line": {"color": "darkslategrey", "width": 1.5},
+        "marker": {"size": 5},
+        "mode": "lines+markers",
+    },
+]
+
+# Runs in the browser: copies new x/y arrays into the figure already shown,
+# so only the series travel on each filter change.
+APPLY_PNL_SERIES = """
+function(series, figure) {
+    if (!series || !figure) {
+        return window.dash_clientside.no_update;
+    }
+    const data = figure.data.map(function(trace, i) {
+        return Object.assign({}, trace, {x: series.x, y: series.y[i]});
+    });
+    return Object.assign({}, figure, {data: data});
+}
+"""
+
+
+# Runs in the browser: narrows each filter dropdown to the choices with rows
+# for the other's selection, from the counts in the filter-options store.
+NARROW_FILTER_OPTIONS = """
+function(counts, department, product) {
+    if (!counts) {
+        const no_update = window.dash_clientside.no_update;
+        return [no_update, no_update];
+    }
+    function choices(names, rows) {
+        return names.filter(function(name) {
+            return rows[name];
+        }).map(function(name) {
+            return {label: name + " (" + rows[name].toLocaleString("en-US") + ")", value: name};
+        });
+    }
+    const departments = product
+        ? counts.product_departments[product] || {}
+        : counts.department_counts;
+    const products = department
+        ? counts.department_products[department] || {}
+        : counts.product_counts;
+    return [
+        choices(counts.departments, departments),
+        choices(counts.products, products)
+    ];
+}
+"""
+
 
+def pnl_series(df: pd.DataFrame) -> Dict[str, list]:
+    "The x/y arrays of the P&L chart's traces, from monthly totals in cents."
+    df = to_dollars(df)
+    return {
+        "x": df["DateTime"].dt.strftime("%Y-%m-%d").tolist(),
+        "y": [df[column].tolist() for column in ["Sales", "COGS", "Profit"]],
+    }
 
-def monthly_totals(df: pd.DataFrame) -> pd.DataFrame:
+
+def create_pnl_chart(df: pd.DataFrame) -> Dict[str, Any]:
+    series = pnl_series(df)
+    data = [
+        dict(trace, x=series["x"], y=y) for trace, y in zip(PNL_TRACES, series["y"])
+    ]
+    return {"data": data, "layout": PNL_LAYOUT}
+
+
+def resample_totals(df: pd.DataFrame, granularity: str = "month") -> pd.DataFrame:
+    "Totals of the rows per bucket, as `TimeCube.get` gives them precomputed."
+    columns = ["DateTime", "Sales", "COGS", "Profit"]
+    if df.empty:
+        # resample() can't infer a frequency from an empty index
+        return df[columns].reset_index(drop=True)
     return (
-        df[["DateTime", "Sales", "COGS", "Profit"]]
-        .resample("1M", on="DateTime")
+        df[columns]
+        .resample(GRANULARITIES[granularity], on="DateTime")
         .sum()
         .reset_index()
     )
 
 
+def date_bounds(df: pd.DataFrame) -> List[Optional[str]]:
+    "The first and last dates of the rows, for the date range picker."
+    # Prepared frames are sorted by date, with blank rows' NaT last
+    dates = df["DateTime"].dropna()
+    if dates.empty:
+        return [None, None]
+    return [dates.iloc[i].strftime("%Y-%m-%d") for i in (0, -1)]
+
+
 def set_layout(
     app: dash.Dash,
-    df: pd.DataFrame,
+    get_datasets: Callable[[], List[str]],
+    get_version: Callable[[Optional[str]], DataVersion],
 ) -> None:
-    departments = df["Department"].unique()
-    products = df["Product"].unique()
-    fig = create_pnl_chart(monthly_totals(df))
+    # Serve the layout from a function so each page load sees the latest data.
+    def serve_layout() -> dbc.Container:
+        datasets = get_datasets()
+        selected = datasets[0] if datasets else None
+        return create_layout(datasets, selected, get_version(selected))
+
+    # Callbacks may target the components of either render mode, though a
+    # page only holds one of them.
+    version = get_version(None)
+    app.validation_layout = html.Div(
+        [serve_layout()]
+        + chart_content(version, CLIENT)
+        + table_content(version, CLIENT)
+    )
+    app.layout = serve_layout
+
+
+def poll_interval_ms() -> int:
+    "Milliseconds between checks for a new data version; 0 means none."
+    if not has_app_context():
+        return 0
+    return int(current_app.config["VERSION_POLL_INTERVAL"] * 1000)
+
 
-    app.layout = dbc.Container(
+def dependent_options(
+    co_occurrence: Dict[str, Any],
+    department: Optional[str] = None,
+    product: Optional[str] = None,
+) -> Tuple[List[Dict[str, str]], List[Dict[str, str]]]:
+    "The dropdown options NARROW_FILTER_OPTIONS picks, for the initial layout."
+    departments = (
+        co_occurrence["product_departments"].get(product, {})
+        if product
+        else co_occurrence["department_counts"]
+    )
+    products = (
+        co_occurrence["department_products"].get(department, {})
+        if department
+        else co_occurrence["product_counts"]
+    )
+
+    def choices(names: List[str], counts: Dict[str, int]) -> List[Dict[str, str]]:
+        return [
+            {"label": f"{name} ({counts[name]:,})", "value": name}
+            for name in names
+            if name in counts
+        ]
+
+    return (
+        choices(co_occurrence["departments"], departments),
+        choices(co_occurrence["products"], products),
+    )
+
+
+def chart_content(version: DataVersion, mode: str) -> List[Any]:
+    """The chart, and the store its data arrives in.
+
+    In client mode the store holds the version's rows, and the chart is
+    redrawn from them in the browser.
+    """
+    fig = create_pnl_chart(version.cube.get(None, None))
+    if mode == CLIENT:
+        return [
+            dcc.Graph(id="client-bar-chart", figure=fig),
+            dcc.Store(id="client-data", data=client_payload(version)),
+        ]
+    return [dcc.Graph(id="bar-chart", figure=fig), dcc.Store(id="chart-series")]
+
+
+def table_content(version: DataVersion, mode: str) -> List[Any]:
+    "The sales table, paged, sorted and filtered in the browser in client mode."
+    common = dict(
+        columns=table_columns,
+        page_current=0,
+        page_size=PAGE_SIZE,
+        sort_mode="multi",
+        sort_by=[],
+        filter_query="",
+        style_cell_conditional=[
+            {
+                "if": {"column_id": c},
+                "textAlign": "left",
+            }
+            for c in ["Date", "Department", "Product"]
+        ],
+        style_as_list_view=True,
+    )
+    if mode == CLIENT:
+        return [
+            DataTable(
+                id="client-table",
+                data=[],
+                page_action="native",
+                sort_action="native",
+                filter_action="native",
+                **common,
+            )
+        ]
+    data, page_count = table_page(version.frame, 0, PAGE_SIZE)
+    return [
+        DataTable(
+            id="sales-table",
+            data=data,
+            page_count=page_count,
+            page_action="custom",
+            sort_action="custom",
+            filter_action="custom",
+            **common,
+        )
+    ]
+
+
+def create_layout(
+    datasets: List[str], selected: Optional[str], version: DataVersion
+) -> dbc.Container:
+    df = version.frame
+    mode = render_mode(version)
+    first_date, last_date = date_bounds(df)
+    poll_ms = poll_interval_ms()
+    department_options, product_options = dependent_options(version.co_occurrence)
+
+    return dbc.Container(
         html.Div(
             [
                 dbc.NavbarSimple(
@@ -75,13 +272,53 @@ def set_layout(
                     color="primary",
                     dark=True,
                 ),
+                # Only the version token is polled; the chart and table are
+                # requested again when it changes.
+                dcc.Store(id="data-version", data=version.token),
+                dcc.Store(id="filter-options", data=version.co_occurrence),
+                dcc.Store(id="render-mode", data=mode),
+                dcc.Interval(
+                    id="version-poll",
+                    interval=poll_ms or 60_000,
+                    disabled=not poll_ms,
+                ),
+                dbc.Row(
+                    [
+                        dbc.Col(
+                            dbc.FormGroup(
+                                [
+                                    dbc.RadioItems(
+                                        id="granularity",
+                                        options=[
+                                            {"label": g.capitalize(), "value": g}
+                                            for g in GRANULARITIES
+                                        ],
+                                        value="month",
+                                        inline=True,
+                                    ),
+                                ],
+                            )
+                        ),
+                        dbc.Col(
+                            dbc.FormGroup(
+                                [
+                                    dcc.DatePickerRange(
+                                        id="date-range",
+                                        min_date_allowed=first_date,
+                                        max_date_allowed=last_date,
+                                        display_format="YYYY-MM-DD",
+                                        clearable=True,
+                                    ),
+                                ],
+                            ),
+                            width="auto",
+                        ),
+                    ],
+                    className="mt-3",
+                ),
                 dbc.Row(
                     dbc.Col(
-                        html.Div(
-                            [
-                                dcc.Graph(id="bar-chart", figure=fig),
-                            ]
-                        )
+                        html.Div(chart_content(version, mode), id="chart-container")
                     )
                 ),
                 dbc.Row(
@@ -90,11 +327,22 @@ def set_layout(
                             dbc.FormGroup(
                                 [
                                     dcc.Dropdown(
-                                        id="department-filter",
+                                        id="dataset-selector",
                                         options=[
-                                            {"label": d, "value": d}
-                                            for d in departments
+                                            {"label": d, "value": d} for d in datasets
                                         ],
+                                        value=selected,
+                                        clearable=False,
+                                    ),
+                                ],
+                            )
+                        ),
+                        dbc.Col(
+                            dbc.FormGroup(
+                                [
+                                    dcc.Dropdown(
+                                        id="department-filter",
+                                        options=department_options,
                                         placeholder="Filter by department",
                                     ),
                                 ],
@@ -105,9 +353,7 @@ def set_layout(
                                 [
                                     dcc.Dropdown(
                                         id="product-filter",
-                                        options=[
-                                            {"label": p, "value": p} for p in products
-                                        ],
+                                        options=product_options,
                                         placeholder="Filter by product",
                                     ),
                                 ],
@@ -115,32 +361,29 @@ def set_layout(
                         ),
                         dbc.Col(
                             [
-                                dbc.Button("Export", id="download-button"),
-                                Download(id="download"),
+                                dbc.Button(
+                                    "Export",
+                                    id="download-button",
+                                    href=export_url("csv", dataset=selected),
+                                    external_link=True,
+                                ),
+                                dbc.Button(
+                                    "Parquet",
+                                    id="download-parquet-button",
+                                    href=export_url("parquet", dataset=selected),
+                                    external_link=True,
+                                    outline=True,
+                                    className="ml-2",
+                                ),
                             ]
                         ),
                     ],
                 ),
                 dbc.Row(
-                    [
-                        dbc.Col(
-                            DataTable(
-                                id="sales-table",
-                                columns=table_columns,
-                                data=df.to_dict("records"),
-                                page_size=20,
-                                style_cell_conditional=[
-                                    {
-                                        "if": {"column_id": c},
-                                        "textAlign": "left",
-                                    }
-                                    for c in ["Date", "Department", "Product"]
-                                ],
-                                style_as_list_view=True,
-                            )
-                        )
-                    ]
+                    dbc.Col(
+                        html.Div(table_content(version, mode), id="table-container")
+                    )
                 ),
             ]
         )
-    )
\ No newline at end of file
+    )
@@ -0,0 +1,270 @@
+"""Request-path metrics, served in the Prometheus text format on /metrics.
+
+Every server-side Dash callback is timed, with the size of its JSON response,
+and callbacks can report how many rows they worked on. Sheet fetches and
+ingests are timed by the sync threads. A fraction of callback calls can also
+be run under cProfile (`PROFILE_SAMPLE_RATE`), writing one stats file each.
+"""
+import cProfile
+import functools
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from dash.exceptions import PreventUpdate
+from flask import Blueprint, Response
+
+from .auth import authenticated
+
+metrics = Blueprint("metrics", __name__)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BYTES_BUCKETS = tuple(10**n for n in range(2, 9))
+ROWS_BUCKETS = tuple(10**n for n in range(0, 9))
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in labels
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str) -> None:
+        self.name = name
+        self.help = help
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> Iterator[Tuple[str, Labels, float]]:
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in values.items():
+            yield self.name, labels, value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float]) -> None:
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        # Per label set: a count per bucket (plus +Inf), and the sum
+        self._values: Dict[Labels, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = _labels(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(
+                key, ([0] * (len(self.buckets) + 1), [0.0])
+            )
+            counts[index] += 1
+            total[0] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> Iterator[Tuple[str, Labels, float]]:
+        with self._lock:
+            values = {k: (list(c), t[0]) for k, (c, t) in self._values.items()}
+        for labels, (counts, total) in values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                yield f"{self.name}_bucket", labels + (("le", le),), cumulative
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulative
+
+
+class Collected:
+    "A metric read from elsewhere, e.g. cache counters, when scraped."
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        kind: str,
+        read: Callable[[], Union[float, Dict[Labels, float]]],
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.read = read
+
+    def samples(self) -> Iterator[Tuple[str, Labels, float]]:
+        values = self.read()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for labels, value in values.items():
+            yield self.name, labels, value
+
+
+class Collector:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Union[Counter, Histogram, Collected]] = {}
+
+    def add(self, metric):
+        # Re-adding replaces, so a new app can rebind what a metric reads
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+collector = Collector()
+
+CALLBACK_SECONDS = collector.add(
+    Histogram(
+        "insight_callback_seconds",
+        "Time to run a Dash callback and serialise its response.",
+        LATENCY_BUCKETS,
+    )
+)
+CALLBACK_BYTES = collector.add(
+    Histogram(
+        "insight_callback_response_bytes",
+        "Size of a Dash callback's JSON response.",
+        BYTES_BUCKETS,
+    )
+)
+CALLBACK_ROWS = collector.add(
+    Histogram("insight_callback_rows", "Rows a Dash callback worked on.", ROWS_BUCKETS)
+)
+CALLBACK_ERRORS = collector.add(
+    Counter("insight_callback_errors_total", "Dash callbacks that raised.")
+)
+FETCH_SECONDS = collector.add(
+    Histogram("insight_sheet_fetch_seconds", "Time to fetch a sheet.", LATENCY_BUCKETS)
+)
+INGEST_SECONDS = collector.add(
+    Histogram(
+        "insight_sheet_ingest_seconds",
+        "Time to parse and publish a changed sheet.",
+        LATENCY_BUCKETS,
+    )
+)
+ROWS_PARSED = collector.add(
+    Counter("insight_sheet_rows_parsed_total", "Sheet rows parsed by syncs.")
+)
+
+_current_callback: ContextVar[Optional[str]] = ContextVar(
+    "current_callback", default=None
+)
+
+
+def record_rows(rows: int) -> None:
+    "Record how many rows the running callback worked on."
+    name = _current_callback.get()
+    if name is not None:
+        CALLBACK_ROWS.observe(rows, callback=name)
+
+
+class SamplingProfiler:
+    """Runs a random fraction of calls under cProfile.
+
+    Each sampled call writes `<name>-<timestamp>.prof` to `directory`, for
+    `python -m pstats` or snakeviz. One call is profiled at a time.
+    """
+
+    def __init__(self, rate: float = 0.0, directory: Optional[str] = None) -> None:
+        self.rate = rate
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def run(self, name: str, fn: Callable, *args, **kwargs):
+        if not self.rate or random.random() >= self.rate:
+            return fn(*args, **kwargs)
+        if not self._lock.acquire(blocking=False):
+            return fn(*args, **kwargs)
+        try:
+            profile = cProfile.Profile()
+            try:
+                return profile.runcall(fn, *args, **kwargs)
+            finally:
+                os.makedirs(self.directory, exist_ok=True)
+                profile.dump_stats(
+                    os.path.join(self.directory, f"{name}-{time.time():.6f}.prof")
+                )
+        finally:
+            self._lock.release()
+
+
+profiler = SamplingProfiler()
+
+
+def instrument(fn: Callable) -> Callable:
+    "Wrap a callback as registered in `Dash.callback_map`."
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        token = _current_callback.set(name)
+        start = time.perf_counter()
+        try:
+            response = profiler.run(name, fn, *args, **kwargs)
+        except PreventUpdate:
+            raise
+        except Exception:
+            CALLBACK_ERRORS.inc(callback=name)
+            raise
+        finally:
+            CALLBACK_SECONDS.observe(time.perf_counter() - start, callback=name)
+            _current_callback.reset(token)
+        CALLBACK_BYTES.observe(len(response), callback=name)
+        return response
+
+    wrapper.instrumented = True
+    return wrapper
+
+
+def instrument_callbacks(dash_app) -> None:
+    for entry in dash_app.callback_map.values():
+        callback = entry.get("callback")
+        # Clientside callbacks have no server function
+        if callback is not None and not getattr(callback, "instrumented", False):
+            entry["callback"] = instrument(callback)
+
+
+@metrics.route("/metrics")
+@authenticated("METRICS_TOKEN")
+def serve_metrics():
+    "Prometheus metrics, for signed-in users or scrapers sending METRICS_TOKEN."
+    return Response(collector.render(), mimetype="text/plain; version=0.0.4")
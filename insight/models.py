@@ -3,7 +3,6 @@ from uuid import uuid4
 from datetime import datetime
 
 from flask_login import UserMixin
-from sqlalchemy.dialects.postgresql import JSON
 
 from . import db
 
@@ -16,11 +15,23 @@ class User(UserMixin, db.Model):
     password = db.Column(db.String(100))
     name = db.Column(db.String(1000))
 
+    # Logins and signups look users up by lower(email)
+    __table_args__ = (db.Index("ix_user_email_lower", db.func.lower(email)),)
+
 
 class Dataset(db.Model):
-    id = db.Column(db.BigInteger, primary_key=True)
+    # SQLite only autoincrements INTEGER primary keys, which the tests rely on
+    id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     spreadsheet_id = db.Column(db.String, nullable=False)
     spreadsheet_range = db.Column(db.String, nullable=False)
     spreadsheet_hash = db.Column(db.String(64), index=True, nullable=False)
-    data = db.Column(JSON, nullable=False)
+    # Prepared frame as a compressed Arrow IPC file; see insight.snapshots
+    data = db.Column(db.LargeBinary, nullable=False)
+    # Recorded with the payload, so listings needn't read it. Snapshots
+    # written before these columns existed have no row count.
+    row_count = db.Column(db.Integer)
+    byte_size = db.Column(db.BigInteger)
+
+    # The admin list pages through snapshots newest first
+    __table_args__ = (db.Index("ix_dataset_created_at_id", created_at, id),)
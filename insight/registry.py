@@ -0,0 +1,294 @@
+"""The datasets served by one deployment, loaded on first use.
+
+Datasets come from the `DATASETS` setting, from uploads and `WATCH_DIR`, and
+from sources already recorded in the `Dataset` table. Each one gets its own
+`DataStore` and `SheetsSync` when a user first opens it; the least recently
+used are dropped again once the loaded frames exceed `DATASET_MEMORY_BUDGET`,
+so memory follows the working set rather than the number of sheets.
+"""
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable, Dict, List, Optional, Set, Union
+
+from flask import Flask
+
+from .data import fetch_data, fetch_local_data
+from .metrics import Collected, collector
+from .sources import (
+    DataSource,
+    DirectoryWatcher,
+    Fetcher,
+    FileSource,
+    file_source_id,
+    source_path,
+)
+from .sync import DataStore, DataVersion, SharedSheetsSync, SheetsSync
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    name: str
+    spreadsheet_id: str
+    spreadsheet_range: str
+
+
+class LoadedDataset:
+    def __init__(self, store: DataStore, sync: SheetsSync) -> None:
+        self.store = store
+        self.sync = sync
+        self.ready = threading.Event()
+
+
+def make_source(app: Flask, spec: DatasetSpec) -> Union[DataSource, Fetcher]:
+    path = source_path(spec.spreadsheet_id)
+    if path is not None:
+        return FileSource(path)
+    if app.config["DATA_SOURCE"] == "local":
+        return partial(fetch_local_data, app.config["LOCAL_DATA_PATH"])
+    return partial(fetch_data, spec.spreadsheet_id, spec.spreadsheet_range)
+
+
+def snapshot_filename(spec: DatasetSpec, suffix: str = ".arrow") -> str:
+    return "{}-{}{}".format(
+        re.sub(r"[^\w-]+", "_", spec.spreadsheet_id),
+        re.sub(r"\W+", "_", spec.spreadsheet_range),
+        suffix,
+    )
+
+
+class DatasetRegistry:
+    def __init__(self) -> None:
+        self.app: Optional[Flask] = None
+        self.memory_budget = 0
+        self.make_source: Callable[
+            [Flask, DatasetSpec], Union[DataSource, Fetcher]
+        ] = make_source
+        self._specs: Dict[str, DatasetSpec] = {}
+        self._loaded: "OrderedDict[str, LoadedDataset]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._watcher: Optional[DirectoryWatcher] = None
+        self._refreshing: Set[str] = set()
+        # Served while nothing is configured, e.g. when Dash validates the
+        # layout at import time.
+        self._empty = DataStore()
+
+    def init_app(self, app: Flask) -> None:
+        with self._lock:
+            for dataset in self._loaded.values():
+                dataset.sync.stop()
+            self._loaded.clear()
+            self._specs.clear()
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+        self.app = app
+        self.make_source = make_source
+        self.memory_budget = app.config["DATASET_MEMORY_BUDGET"]
+        for name, settings in app.config["DATASETS"].items():
+            if "path" in settings:
+                self.register_file(settings["path"], name)
+            else:
+                self.register(
+                    DatasetSpec(name, settings["spreadsheet_id"], settings["range"])
+                )
+        app.extensions["datasets"] = self
+        if app.config["WATCH_DIR"]:
+            self._watcher = DirectoryWatcher(
+                self, app.config["WATCH_DIR"], app.config["WATCH_INTERVAL"]
+            )
+            self._watcher.start()
+
+    def register(self, spec: DatasetSpec) -> None:
+        with self._lock:
+            self._specs[spec.name] = spec
+
+    def register_file(self, path: str, name: Optional[str] = None) -> str:
+        """Register a CSV, Excel or Parquet file as a dataset, and return its name.
+
+        Files are named after their stem unless given a name.
+        """
+        spreadsheet_id = file_source_id(path)
+        with self._lock:
+            for spec in self._specs.values():
+                if spec.spreadsheet_id == spreadsheet_id:
+                    return spec.name
+            name = name or os.path.splitext(os.path.basename(path))[0]
+            if name in self._specs:
+                name = f"{name} ({os.path.basename(path)})"
+            self._specs[name] = DatasetSpec(name, spreadsheet_id, name)
+        return name
+
+    def discover(self) -> None:
+        "Register sheets that have `Dataset` rows but aren't configured."
+        from .models import Dataset
+
+        try:
+            with self.app.app_context():
+                sheets = (
+                    Dataset.query.with_entities(
+                        Dataset.spreadsheet_id, Dataset.spreadsheet_range
+                    )
+                    .distinct()
+                    .all()
+                )
+        except Exception:
+            logger.exception("Failed to list saved datasets")
+            return
+        known = {(s.spreadsheet_id, s.spreadsheet_range) for s in self._specs.values()}
+        for spreadsheet_id, spreadsheet_range in sheets:
+            if (spreadsheet_id, spreadsheet_range) in known:
+                continue
+            name = spreadsheet_range
+            if name in self._specs:
+                name = f"{spreadsheet_range} ({spreadsheet_id})"
+            self.register(DatasetSpec(name, spreadsheet_id, spreadsheet_range))
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._specs)
+
+    @property
+    def default(self) -> Optional[str]:
+        return next(iter(self._specs), None)
+
+    def loaded(self) -> List[str]:
+        "Names of the datasets held in memory, least recently used first."
+        return list(self._loaded)
+
+    def get(self, name: Optional[str] = None) -> DataStore:
+        """The store of a dataset, loading it if needed.
+
+        `None` means the default dataset; unknown names raise `KeyError`.
+        """
+        name = name or self.default
+        if name is None:
+            return self._empty
+        with self._lock:
+            dataset = self._loaded.get(name)
+            loading = dataset is None
+            if loading:
+                dataset = self._loaded[name] = self._create(self._specs[name])
+            self._loaded.move_to_end(name)
+
+        if loading:
+            # Outside the lock, so other datasets stay available meanwhile.
+            try:
+                dataset.sync.load_snapshot()
+                dataset.sync.start()
+            finally:
+                dataset.ready.set()
+        else:
+            dataset.ready.wait()
+        # Checked on every access, since a refresh may have grown a dataset
+        self._evict()
+        return dataset.store
+
+    def refresh(self, name: str) -> bool:
+        """Sync a loaded dataset now, rather than at its next poll.
+
+        Datasets that aren't loaded are read when next opened anyway.
+        """
+        dataset = self._loaded.get(name)
+        if dataset is None:
+            return False
+        dataset.ready.wait()
+        return dataset.sync.sync_once()
+
+    def schedule_refresh(self, name: str) -> bool:
+        """Load and sync a dataset in the background.
+
+        Returns False if a refresh of it is already running.
+        """
+        with self._lock:
+            if name in self._refreshing:
+                return False
+            self._refreshing.add(name)
+
+        def run() -> None:
+            try:
+                with self._lock:
+                    loaded = name in self._loaded
+                self.get(name)
+                # Loading a dataset starts its sync, which fetches at once
+                if loaded:
+                    self.refresh(name)
+            except Exception:
+                logger.exception("Failed to refresh dataset %s", name)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(name)
+
+        threading.Thread(target=run, name="dataset-refresh", daemon=True).start()
+        return True
+
+    def version(self, name: Optional[str] = None) -> DataVersion:
+        return self.get(name).version
+
+    def memory_usage(self) -> int:
+        return sum(self.memory_by_dataset().values())
+
+    def memory_by_dataset(self) -> Dict[str, int]:
+        return {
+            name: dataset.store.version.nbytes
+            for name, dataset in list(self._loaded.items())
+        }
+
+    def _create(self, spec: DatasetSpec) -> LoadedDataset:
+        config = self.app.config
+        store = DataStore()
+        snapshot_dir = config["SNAPSHOT_DIR"] or self.app.instance_path
+        args = (
+            self.app,
+            store,
+            self.make_source(self.app, spec),
+            spec.spreadsheet_id,
+            spec.spreadsheet_range,
+        )
+        kwargs = dict(
+            interval=config["SYNC_INTERVAL"],
+            snapshot_path=os.path.join(snapshot_dir, snapshot_filename(spec)),
+        )
+        if config["SHARED_DATA_DIR"]:
+            os.makedirs(config["SHARED_DATA_DIR"], exist_ok=True)
+            sync = SharedSheetsSync(
+                *args,
+                shared_path=os.path.join(
+                    config["SHARED_DATA_DIR"], snapshot_filename(spec, ".shared.arrow")
+                ),
+                poll_interval=config["SHARED_POLL_INTERVAL"],
+                **kwargs,
+            )
+        else:
+            sync = SheetsSync(*args, **kwargs)
+        return LoadedDataset(store, sync)
+
+    def _evict(self) -> None:
+        if not self.memory_budget:
+            return
+        with self._lock:
+            # The most recently used dataset stays, whatever its size.
+            while len(self._loaded) > 1 and self.memory_usage() > self.memory_budget:
+                name, dataset = self._loaded.popitem(last=False)
+                dataset.sync.stop()
+                logger.info("Evicted dataset %s", name)
+
+
+registry = DatasetRegistry()
+collector.add(
+    Collected(
+        "insight_dataset_bytes",
+        "Memory held by each loaded dataset's frame.",
+        "gauge",
+        lambda: {
+            (("dataset", name),): nbytes
+            for name, nbytes in registry.memory_by_dataset().items()
+        },
+    )
+)
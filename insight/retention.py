@@ -0,0 +1,55 @@
+"""Pruning of `Dataset` snapshots.
+
+Every change to a sheet adds a snapshot, but only the newest of each sheet
+is read back. `flask datasets compact` (e.g. run daily from cron) keeps the
+newest `SNAPSHOTS_KEPT` snapshots of each sheet, counting each content hash
+once, and deletes the rest. Only ids and hashes are read, never payloads.
+"""
+from typing import Dict, List, Set
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from . import db
+from .models import Dataset
+
+DELETE_BATCH_ROWS = 500
+
+datasets_cli = AppGroup("datasets", help="Manage stored dataset snapshots.")
+
+
+def compact_snapshots(keep: int) -> int:
+    """Delete all but the newest `keep` distinct snapshots of each sheet.
+
+    Older snapshots with the same hash as a newer one are deleted first, so
+    restoring an earlier sheet doesn't use up the quota. The newest snapshot
+    of a sheet is always kept. Returns the number deleted.
+    """
+    if keep < 1:
+        raise ValueError("At least one snapshot per sheet must be kept")
+    rows = Dataset.query.with_entities(
+        Dataset.id, Dataset.spreadsheet_id, Dataset.spreadsheet_hash
+    ).order_by(Dataset.created_at.desc(), Dataset.id.desc())
+    kept: Dict[str, Set[str]] = {}
+    doomed: List[int] = []
+    for id, spreadsheet_id, digest in rows:
+        hashes = kept.setdefault(spreadsheet_id, set())
+        if digest in hashes or len(hashes) >= keep:
+            doomed.append(id)
+        else:
+            hashes.add(digest)
+
+    for start in range(0, len(doomed), DELETE_BATCH_ROWS):
+        ids = doomed[start : start + DELETE_BATCH_ROWS]
+        Dataset.query.filter(Dataset.id.in_(ids)).delete(synchronize_session=False)
+    db.session.commit()
+    return len(doomed)
+
+
+@datasets_cli.command("compact")
+@click.option("--keep", type=int, help="Snapshots kept per sheet.")
+def compact_command(keep: int) -> None:
+    "Delete duplicate and old dataset snapshots."
+    deleted = compact_snapshots(keep or current_app.config["SNAPSHOTS_KEPT"])
+    click.echo(f"Deleted {deleted} snapshots")
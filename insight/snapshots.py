@@ -0,0 +1,79 @@
+"""Binary snapshots of prepared frames, as stored in `Dataset.data`.
+
+Snapshots are compressed Arrow IPC files holding the already-typed columns,
+so loading one skips parsing the sheet again.
+"""
+import os
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from .data import MONEY_COLUMNS
+
+COMPRESSION = "zstd"
+HASH_KEY = b"spreadsheet_hash"
+MONEY_FIELD = "Money"
+
+
+def _to_table(df: pd.DataFrame, spreadsheet_hash: str) -> pa.Table:
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    return table.replace_schema_metadata(
+        {**table.schema.metadata, HASH_KEY: spreadsheet_hash.encode()}
+    )
+
+
+def _from_table(table: pa.Table, **options) -> Tuple[pd.DataFrame, str]:
+    df = table.to_pandas(**options)
+    return df, table.schema.metadata[HASH_KEY].decode()
+
+
+def dump_frame(df: pd.DataFrame, spreadsheet_hash: str) -> bytes:
+    sink = pa.BufferOutputStream()
+    feather.write_feather(
+        _to_table(df, spreadsheet_hash), sink, compression=COMPRESSION
+    )
+    return sink.getvalue().to_pybytes()
+
+
+def load_frame(payload: bytes) -> Tuple[pd.DataFrame, str]:
+    "The prepared frame in a snapshot, and the hash of the sheet it came from."
+    return _from_table(feather.read_table(pa.py_buffer(payload)))
+
+
+def write_shared_frame(path: str, df: pd.DataFrame, spreadsheet_hash: str) -> None:
+    """Write a frame for other processes to memory-map with `map_shared_frame`.
+
+    The file is uncompressed and holds one record batch, so readers can use
+    its columns in place. The money columns are stored together, row by row,
+    as one fixed-size list column. It is replaced by a rename: readers
+    holding the old file keep a consistent view until they map the new one.
+    """
+    money = df[MONEY_COLUMNS].to_numpy(np.int64).ravel()
+    table = _to_table(df.drop(columns=MONEY_COLUMNS), spreadsheet_hash).append_column(
+        MONEY_FIELD,
+        pa.FixedSizeListArray.from_arrays(pa.array(money), len(MONEY_COLUMNS)),
+    )
+    partial_path = f"{path}.{os.getpid()}.tmp"
+    feather.write_feather(
+        table, partial_path, compression="uncompressed", chunksize=max(len(df), 1)
+    )
+    os.replace(partial_path, path)
+
+
+def map_shared_frame(path: str) -> Tuple[pd.DataFrame, str]:
+    """Map a file written by `write_shared_frame`.
+
+    The columns are read-only views of the mapped pages, shared with every
+    other process mapping the same file. The money columns come out as one
+    pandas block, so pandas never copies them to merge same-typed columns.
+    """
+    table = feather.read_table(path, memory_map=True)
+    chunks = table.column(MONEY_FIELD).chunks
+    values = chunks[0].flatten().to_numpy() if chunks else np.empty(0, np.int64)
+    df, spreadsheet_hash = _from_table(table.drop([MONEY_FIELD]), split_blocks=True)
+    # Each row's amounts are adjacent, so the columns are strided views
+    money = pd.DataFrame(values.reshape(-1, len(MONEY_COLUMNS)), columns=MONEY_COLUMNS)
+    return pd.concat([df, money], axis=1, copy=False), spreadsheet_hash
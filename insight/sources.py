@@ -0,0 +1,245 @@
+"""Where a dataset's rows come from.
+
+A `DataSource` is polled by the dataset's sync thread: `fetch` returns the
+raw payload with a content digest, and when the digest changed, `parse`
+turns the payload into prepared rows. Sheets are fetched through the API and
+ingested incrementally; files, such as uploads and those in `WATCH_DIR`, are
+read from disk in chunks of typed columns.
+
+Datasets backed by a file are recorded with a `spreadsheet_id` of
+"file:<path>", which is how they're found again after a restart.
+"""
+import hashlib
+import itertools
+import logging
+import os
+import threading
+from contextlib import closing
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from .data import COLUMNS, SheetData, concat_frames, prepare_frame, spreadsheet_hash
+from .ingest import IncrementalIngest
+
+logger = logging.getLogger(__name__)
+
+Fetcher = Callable[[], SheetData]
+
+FILE_PREFIX = "file:"
+# Rows parsed at a time. Only the typed columns of each chunk are kept, so
+# a large file is never held as text in full.
+FILE_CHUNK_ROWS = 100_000
+HASH_BLOCK_BYTES = 1 << 20
+
+
+class DataSource:
+    def fetch(self) -> Tuple[Any, str]:
+        "The current payload and its digest."
+        raise NotImplementedError
+
+    def parse(
+        self, payload: Any, digest: str, base_digest: str
+    ) -> Tuple[int, pd.DataFrame]:
+        """Prepare what changed in `payload` relative to the version `base_digest`.
+
+        Returns how many leading rows are unchanged, and the rest prepared,
+        indexed by their position in the source.
+        """
+        raise NotImplementedError
+
+
+class SheetsSource(DataSource):
+    def __init__(self, fetch: Fetcher) -> None:
+        self._fetch = fetch
+        self.ingest = IncrementalIngest()
+
+    def fetch(self) -> Tuple[SheetData, str]:
+        values = self._fetch()
+        return values, spreadsheet_hash(values)
+
+    def parse(
+        self, payload: SheetData, digest: str, base_digest: str
+    ) -> Tuple[int, pd.DataFrame]:
+        return self.ingest.ingest(payload, digest, base_digest)
+
+
+class FileSource(DataSource):
+    "A CSV, Excel or Parquet file, read again whenever its content changes."
+
+    def __init__(self, path: str, chunk_rows: int = FILE_CHUNK_ROWS) -> None:
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self._stamp: Optional[Tuple[int, int, int]] = None
+        self._digest = ""
+
+    def fetch(self) -> Tuple[str, str]:
+        stat = os.stat(self.path)
+        stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        # Hashing is only needed when the file was touched since last time
+        if stamp != self._stamp:
+            self._digest = file_hash(self.path)
+            self._stamp = stamp
+        return self.path, self._digest
+
+    def parse(
+        self, payload: str, digest: str, base_digest: str
+    ) -> Tuple[int, pd.DataFrame]:
+        return 0, read_file(payload, self.chunk_rows)
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_source_id(path: str) -> str:
+    return FILE_PREFIX + os.path.abspath(path)
+
+
+def source_path(spreadsheet_id: str) -> Optional[str]:
+    "The file behind a dataset's `spreadsheet_id`, if it isn't a sheet."
+    if spreadsheet_id.startswith(FILE_PREFIX):
+        return spreadsheet_id[len(FILE_PREFIX) :]
+    return None
+
+
+def _csv_chunks(path: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    # Read as text so formatted amounts such as "$ (1,234.56)" parse as in
+    # sheets; each chunk is typed before the next is read.
+    yield from pd.read_csv(path, dtype=str, chunksize=chunk_rows)
+
+
+def _excel_chunks(path: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        headers = next(rows, None)
+        if headers is None:
+            return
+        start = 0
+        while True:
+            chunk = list(itertools.islice(rows, chunk_rows))
+            if not chunk:
+                break
+            yield pd.DataFrame(
+                chunk,
+                columns=headers,
+                index=pd.RangeIndex(start, start + len(chunk)),
+            )
+            start += len(chunk)
+    finally:
+        workbook.close()
+
+
+def _parquet_chunks(path: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(path)
+    names = [n for n in parquet.schema_arrow.names if n.strip() in COLUMNS]
+    start = 0
+    for batch in parquet.iter_batches(batch_size=chunk_rows, columns=names):
+        chunk = batch.to_pandas()
+        chunk.index += start
+        start += len(chunk)
+        yield chunk
+
+
+FILE_READERS: Dict[str, Callable[[str, int], Iterator[pd.DataFrame]]] = {
+    ".csv": _csv_chunks,
+    ".xlsx": _excel_chunks,
+    ".xlsm": _excel_chunks,
+    ".parquet": _parquet_chunks,
+}
+
+
+def is_supported(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in FILE_READERS
+
+
+def check_file(path: str, rows: int = 100) -> None:
+    "Raise `ValueError` unless the first rows of a file can be prepared."
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FILE_READERS:
+        raise ValueError(f"Unsupported file type: {extension or path}")
+    with closing(FILE_READERS[extension](path, rows)) as chunks:
+        chunk = next(chunks, None)
+    if chunk is None:
+        raise ValueError("No data found")
+    prepare_frame(chunk)
+
+
+def read_file(path: str, chunk_rows: int = FILE_CHUNK_ROWS) -> pd.DataFrame:
+    "Read a CSV, Excel or Parquet file of sheet rows into a prepared frame."
+    extension = os.path.splitext(path)[1].lower()
+    try:
+        read_chunks = FILE_READERS[extension]
+    except KeyError:
+        raise ValueError(f"Unsupported file type: {extension or path}") from None
+
+    parts = [prepare_frame(chunk) for chunk in read_chunks(path, chunk_rows)]
+    if not parts:
+        raise RuntimeError("No data found")
+    frame = concat_frames(*parts) if len(parts) > 1 else parts[0]
+    # Free the chunks before sorting, so at most two full copies are held
+    del parts
+    frame.sort_values(by=["DateTime"], kind="mergesort", inplace=True)
+    return frame
+
+
+class DirectoryWatcher(threading.Thread):
+    """Registers each supported file in a directory as a dataset.
+
+    Files are named after their stem; hidden files, such as uploads in
+    progress, are skipped. New files are registered as they
+    appear, and datasets already loaded are refreshed when their file
+    changes, rather than at the next `SYNC_INTERVAL`.
+    """
+
+    def __init__(self, registry, directory: str, interval: float) -> None:
+        super().__init__(name="directory-watcher", daemon=True)
+        self.registry = registry
+        self.directory = directory
+        self.interval = interval
+        self._stamps: Dict[str, Tuple[int, int]] = {}
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while True:
+            try:
+                self.scan()
+            except Exception:
+                logger.exception("Failed to scan %s", self.directory)
+            if self.interval <= 0 or self._stopped.wait(self.interval):
+                break
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def scan(self) -> List[str]:
+        "Register new files and refresh changed ones; returns their names."
+        changed = []
+        for entry in sorted(os.scandir(self.directory), key=lambda e: e.name):
+            if (
+                entry.name.startswith(".")
+                or not entry.is_file()
+                or not is_supported(entry.name)
+            ):
+                continue
+            stat = entry.stat()
+            stamp = (stat.st_mtime_ns, stat.st_size)
+            if self._stamps.get(entry.path) == stamp:
+                continue
+            self._stamps[entry.path] = stamp
+            name = self.registry.register_file(entry.path)
+            try:
+                self.registry.refresh(name)
+            except Exception:
+                logger.exception("Failed to read %s", entry.path)
+            changed.append(name)
+        return changed
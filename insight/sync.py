@@ -0,0 +1,410 @@
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from functools import cached_property
+from typing import Any, Dict, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from flask import Flask
+
+from .aggregates import TimeCube
+from .data import concat_frames, empty_frame
+from .filters import FilterIndex
+from .metrics import FETCH_SECONDS, INGEST_SECONDS, ROWS_PARSED
+from .snapshots import dump_frame, load_frame, map_shared_frame, write_shared_frame
+from .sources import DataSource, Fetcher, SheetsSource
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DataVersion:
+    frame: pd.DataFrame
+    spreadsheet_hash: str
+    loaded_at: datetime
+    cube: TimeCube
+    index: FilterIndex
+    # Sheet positions of the frame's rows, or None if they are in sheet order
+    positions: Optional[np.ndarray] = None
+
+    @property
+    def token(self) -> str:
+        "Short version identifier sent to dashboards, empty until loaded."
+        return self.spreadsheet_hash[:16]
+
+    @cached_property
+    def co_occurrence(self) -> Dict[str, Any]:
+        "Row counts for narrowing the filter dropdowns; see FilterIndex."
+        return self.index.co_occurrence()
+
+    @cached_property
+    def nbytes(self) -> int:
+        "Memory held by the frame, counted once per version."
+        positions = 0 if self.positions is None else self.positions.nbytes
+        return int(self.frame.memory_usage(deep=True).sum()) + positions
+
+    def sheet_positions(self) -> np.ndarray:
+        "Each row's position in the sheet."
+        if self.positions is None:
+            return np.arange(len(self.frame))
+        return self.positions
+
+    @classmethod
+    def build(cls, frame: pd.DataFrame, digest: str) -> "DataVersion":
+        "Wrap a prepared frame, computing everything derived from it up front."
+        frame, positions = _split_positions(frame)
+        return cls(
+            frame,
+            digest,
+            datetime.utcnow(),
+            TimeCube(frame),
+            FilterIndex(frame),
+            positions,
+        )
+
+    def extend(self, prefix: int, tail: pd.DataFrame, digest: str) -> "DataVersion":
+        """This version with the sheet rows from `prefix` on replaced by `tail`.
+
+        When rows were only appended, and after the existing ones in date
+        order, the cube and filter index are extended rather than rebuilt.
+        """
+        frame, positions = self.frame, self.sheet_positions()
+        appended = prefix >= len(frame)
+        if not appended:
+            kept_rows = positions < prefix
+            frame, positions = frame[kept_rows], positions[kept_rows]
+        merged = concat_frames(frame, tail)
+        merged.index = np.concatenate([positions, tail.index.to_numpy()])
+        if appended and (
+            frame.empty
+            or tail.empty
+            or tail["DateTime"].iloc[0] >= frame["DateTime"].iloc[-1]
+        ):
+            merged, positions = _split_positions(merged)
+            return DataVersion(
+                merged,
+                digest,
+                datetime.utcnow(),
+                self.cube + TimeCube(tail),
+                self.index.extend(FilterIndex(tail), len(frame)),
+                positions,
+            )
+        # Both parts are sorted, which a stable sort merges in linear time
+        merged = merged.sort_values(by=["DateTime"], kind="mergesort")
+        return DataVersion.build(merged, digest)
+
+
+def _split_positions(frame: pd.DataFrame) -> Tuple[pd.DataFrame, Optional[np.ndarray]]:
+    """`frame` with a RangeIndex, and the sheet positions its index held.
+
+    pandas 1.x only has int64 indexes; int32 positions take half the memory,
+    and none are kept when the rows are already in sheet order, as in an
+    append-only ledger.
+    """
+    index = frame.index
+    positions = None
+    # Positions are distinct, so sorted ones from 0 to len - 1 are a range
+    if not index.is_monotonic_increasing or (
+        len(index) and (index[0] != 0 or index[-1] != len(index) - 1)
+    ):
+        fits = index.max() < np.iinfo(np.int32).max
+        positions = index.to_numpy(np.int32 if fits else np.int64)
+    elif isinstance(index, pd.RangeIndex):
+        return frame, None
+    frame = frame.copy(deep=False)
+    frame.index = pd.RangeIndex(len(frame))
+    return frame, positions
+
+
+class DataStore:
+    """Holds the dataset version currently being served.
+
+    Versions are immutable and replaced by a single reference assignment, so
+    callbacks that already hold a frame keep using it while a refresh lands.
+    """
+
+    def __init__(self) -> None:
+        # An empty version with no hash is served until the first load.
+        self._version = DataVersion.build(empty_frame(), "")
+
+    @property
+    def version(self) -> DataVersion:
+        return self._version
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        return self._version.frame
+
+    def swap(self, frame: pd.DataFrame, digest: str) -> DataVersion:
+        return self.publish(DataVersion.build(frame, digest))
+
+    def publish(self, version: DataVersion) -> DataVersion:
+        self._version = version
+        return version
+
+
+class SheetsSync(threading.Thread):
+    """Polls a dataset's source and records a new `Dataset` whenever its content
+    changes.
+
+    `fetch` is a `DataSource`, or a function returning sheet values.
+    """
+
+    def __init__(
+        self,
+        app: Flask,
+        store: DataStore,
+        fetch: Union[DataSource, Fetcher],
+        spreadsheet_id: str,
+        spreadsheet_range: str,
+        interval: float,
+        snapshot_path: Optional[str] = None,
+    ) -> None:
+        super().__init__(name="sheets-sync", daemon=True)
+        self.app = app
+        self.store = store
+        self.source = fetch if isinstance(fetch, DataSource) else SheetsSource(fetch)
+        self.spreadsheet_id = spreadsheet_id
+        self.spreadsheet_range = spreadsheet_range
+        self.interval = interval
+        self.snapshot_path = snapshot_path
+        self._stopped = threading.Event()
+        # Held while syncing, so a refresh requested meanwhile waits for it
+        self._syncing = threading.Lock()
+
+    def run(self) -> None:
+        while True:
+            try:
+                self.sync_once()
+            except Exception:
+                logger.exception("Failed to sync %s", self.spreadsheet_id)
+            if self.interval <= 0 or self._stopped.wait(self.interval):
+                break
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def load_snapshot(self) -> bool:
+        """Serve the last known data while the first fetch runs.
+
+        Tries the local snapshot file, then the newest persisted `Dataset`.
+        """
+        try:
+            payload = self._read_snapshot_file() or self._read_latest_dataset()
+            if not payload:
+                return False
+            frame, digest = load_frame(payload)
+        except Exception:
+            logger.exception("Failed to load snapshot of %s", self.spreadsheet_id)
+            return False
+
+        self.store.swap(frame, digest)
+        return True
+
+    def sync_once(self) -> bool:
+        "Fetch the source and swap in a new version if it changed."
+        with self._syncing:
+            return self._sync()
+
+    def _sync(self) -> bool:
+        with FETCH_SECONDS.time(spreadsheet=self.spreadsheet_id):
+            raw, digest = self.source.fetch()
+        current = self.store.version
+        if current.spreadsheet_hash == digest:
+            return False
+
+        with INGEST_SECONDS.time(spreadsheet=self.spreadsheet_id):
+            prefix, tail = self.source.parse(raw, digest, current.spreadsheet_hash)
+            if prefix:
+                version = current.extend(prefix, tail, digest)
+            else:
+                version = DataVersion.build(tail, digest)
+            payload = dump_frame(version.frame, digest)
+            with self.app.app_context():
+                self._persist(payload, digest, len(version.frame))
+            self._write_snapshot_file(payload)
+            self.store.publish(version)
+        ROWS_PARSED.inc(len(tail), spreadsheet=self.spreadsheet_id)
+        logger.info(
+            "Loaded %s rows from %s, parsing %s",
+            len(version.frame),
+            self.spreadsheet_id,
+            len(tail),
+        )
+        return True
+
+    def _persist(self, payload: bytes, digest: str, row_count: int) -> None:
+        from . import db
+        from .models import Dataset
+
+        try:
+            latest = (
+                Dataset.query.with_entities(Dataset.spreadsheet_hash)
+                .filter_by(spreadsheet_id=self.spreadsheet_id)
+                .order_by(Dataset.created_at.desc())
+                .first()
+            )
+            if latest is not None and latest.spreadsheet_hash == digest:
+                return
+            db.session.add(
+                Dataset(
+                    spreadsheet_id=self.spreadsheet_id,
+                    spreadsheet_range=self.spreadsheet_range,
+                    spreadsheet_hash=digest,
+                    data=payload,
+                    row_count=row_count,
+                    byte_size=len(payload),
+                )
+            )
+            db.session.commit()
+        except Exception:
+            # The in-memory swap still goes ahead; the next change retries.
+            db.session.rollback()
+            logger.exception("Failed to persist dataset %s", digest)
+
+    def _read_snapshot_file(self) -> Optional[bytes]:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return None
+        with open(self.snapshot_path, "rb") as f:
+            return f.read()
+
+    def _write_snapshot_file(self, payload: bytes) -> None:
+        if not self.snapshot_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+            # Write then rename, so a crash never leaves a truncated snapshot
+            # and workers sharing the directory each write their own partial file.
+            partial_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+            with open(partial_path, "wb") as f:
+                f.write(payload)
+            os.replace(partial_path, self.snapshot_path)
+        except OSError:
+            logger.exception("Failed to write snapshot %s", self.snapshot_path)
+
+    def _read_latest_dataset(self) -> Optional[bytes]:
+        from .models import Dataset
+
+        with self.app.app_context():
+            latest = (
+                Dataset.query.filter_by(spreadsheet_id=self.spreadsheet_id)
+                .order_by(Dataset.created_at.desc())
+                .first()
+            )
+            return bytes(latest.data) if latest is not None else None
+
+
+class SharedSheetsSync(SheetsSync):
+    """A `SheetsSync` for one of several worker processes serving a dataset.
+
+    Whichever worker holds the dataset's lock file fetches the sheet, and
+    writes each new version to a shared, memory-mapped Arrow file. The others
+    only map that file whenever it is replaced, so the sheet is fetched once
+    and the frame's pages are shared. If the fetching worker exits, another
+    takes over the lock. Refreshes requested from another worker are passed
+    to the leader through a request file next to the shared one.
+    """
+
+    def __init__(
+        self,
+        *args,
+        shared_path: str,
+        poll_interval: float = 1.0,
+        **kwargs,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.shared_path = shared_path
+        self.poll_interval = poll_interval
+        self.leading = False
+        self.request_path = f"{shared_path}.refresh"
+        self._lock_file = None
+        self._mapped = None
+
+    def run(self) -> None:
+        next_sync = 0.0
+        try:
+            while True:
+                try:
+                    self.leading = self.leading or self._acquire_lock()
+                    if not self.leading:
+                        self.follow()
+                    elif time.monotonic() >= next_sync or self._take_request():
+                        next_sync = (
+                            time.monotonic() + self.interval
+                            if self.interval > 0
+                            else float("inf")
+                        )
+                        self.sync_once()
+                except Exception:
+                    logger.exception("Failed to sync %s", self.spreadsheet_id)
+                if self._stopped.wait(self.poll_interval):
+                    break
+        finally:
+            if self._lock_file is not None:
+                self._lock_file.close()
+
+    def load_snapshot(self) -> bool:
+        return self.follow() or super().load_snapshot()
+
+    def follow(self) -> bool:
+        "Map the shared file if it was replaced since last time."
+        try:
+            stat = os.stat(self.shared_path)
+        except FileNotFoundError:
+            return False
+        stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if stamp == self._mapped:
+            return False
+        frame, digest = map_shared_frame(self.shared_path)
+        self._mapped = stamp
+        if digest == self.store.version.spreadsheet_hash:
+            return False
+        self.store.swap(frame, digest)
+        logger.info("Mapped %s rows of %s", len(frame), self.spreadsheet_id)
+        return True
+
+    def sync_once(self) -> bool:
+        """Sync now if this worker leads; otherwise ask the leader to.
+
+        Followers never fetch or write the shared file. They map whatever
+        the leader last wrote, and pick up the refreshed version once the
+        leader has written it.
+        """
+        if not self.leading:
+            open(self.request_path, "a").close()
+            return self.follow()
+        changed = super().sync_once()
+        version = self.store.version
+        if changed or (
+            version.spreadsheet_hash and not os.path.exists(self.shared_path)
+        ):
+            write_shared_frame(
+                self.shared_path, version.frame, version.spreadsheet_hash
+            )
+        return changed
+
+    def _acquire_lock(self) -> bool:
+        import fcntl
+
+        lock_file = open(f"{self.shared_path}.lock", "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        self.leading = True
+        logger.info("Fetching %s for all workers", self.spreadsheet_id)
+        return True
+
+    def _take_request(self) -> bool:
+        "Whether a follower asked for a sync since the last check."
+        try:
+            os.remove(self.request_path)
+        except FileNotFoundError:
+            return False
+        return True
@@ -0,0 +1,108 @@
+"Server-side paging, sorting and filtering for the `sales-table` DataTable."
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from .data import CENTS, COLUMNS, MONEY_COLUMNS, sheet_rows
+
+FilterPart = Tuple[str, str, str]
+
+# Operators DataTable writes into filter_query, in the order they are matched.
+OPERATORS = [
+    ("ge ", ">="),
+    ("le ", "<="),
+    ("lt ", "<"),
+    ("gt ", ">"),
+    ("ne ", "!="),
+    ("eq ", "="),
+    ("contains ",),
+    ("datestartswith ",),
+]
+
+
+def split_filter_part(filter_part: str) -> Optional[FilterPart]:
+    "Parse one `{column} op value` clause of a DataTable filter_query."
+    for operator_type in OPERATORS:
+        for operator in operator_type:
+            if operator in filter_part:
+                name_part, value_part = filter_part.split(operator, 1)
+                name = name_part[name_part.find("{") + 1 : name_part.rfind("}")]
+
+                value_part = value_part.strip()
+                v0 = value_part[:1]
+                if v0 and v0 == value_part[-1] and v0 in ("'", '"', "`"):
+                    value = value_part[1:-1].replace("\\" + v0, v0)
+                else:
+                    # Numbers are parsed by _match, only for numeric columns
+                    value = value_part
+
+                # word operators need spaces after them in the filter string,
+                # but we don't want these later
+                return name, operator_type[0].strip(), value
+
+    return None
+
+
+def filter_mask(df: pd.DataFrame, filter_query: str) -> Optional[pd.Series]:
+    "Rows matching every clause of `filter_query`, or None if it is empty."
+    mask = None
+    for filter_part in filter_query.split(" && ") if filter_query else []:
+        part = split_filter_part(filter_part)
+        if part is None or part[0] not in COLUMNS:
+            continue
+        matches = _match(df, *part)
+        mask = matches if mask is None else mask & matches
+
+    return mask
+
+
+def _match(df: pd.DataFrame, column: str, operator: str, value: str) -> pd.Series:
+    # Dates are displayed from DateTime, so they are matched on it
+    series = df["DateTime" if column == "Date" else column]
+    if column == "Date":
+        if operator in ("contains", "datestartswith"):
+            dates = series.dt.strftime("%Y-%m-%d")
+            return dates.str.startswith(value)
+        when: Any = pd.to_datetime(value, errors="coerce")
+        return getattr(series, operator)(when)
+    if column in MONEY_COLUMNS:
+        series = series / CENTS
+    elif operator not in ("eq", "ne"):
+        # Department and Product are unordered categoricals
+        series = series.astype(str)
+
+    if operator == "contains":
+        return series.astype(str).str.contains(value, regex=False)
+    if operator == "datestartswith":
+        return series.astype(str).str.startswith(value)
+    if column in MONEY_COLUMNS:
+        number: Any = pd.to_numeric(value, errors="coerce")
+        return getattr(series, operator)(number)
+    return getattr(series, operator)(value)
+
+
+def table_page(
+    df: pd.DataFrame,
+    page_current: Optional[int],
+    page_size: int,
+    sort_by: Optional[List[Dict[str, str]]] = None,
+    filter_query: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], int]:
+    "The visible page of `df` as records, and the number of pages."
+    mask = filter_mask(df, filter_query or "")
+    if mask is not None:
+        df = df[mask]
+
+    page_count = max(math.ceil(len(df) / page_size), 1)
+    page = min(page_current or 0, page_count - 1)
+    start, stop = page * page_size, (page + 1) * page_size
+    if sort_by:
+        columns = [
+            "DateTime" if s["column_id"] == "Date" else s["column_id"] for s in sort_by
+        ]
+        ascending = [s["direction"] == "asc" for s in sort_by]
+        df = df.sort_values(columns, ascending=ascending)
+
+    page_rows = sheet_rows(df.iloc[start:stop])
+    return page_rows.to_dict("records"), page_count
@@ -0,0 +1,62 @@
+"Uploads of CSV, Excel and Parquet files, each served as a dataset."
+import os
+
+from flask import (
+    Blueprint,
+    current_app,
+    flash,
+    redirect,
+    render_template,
+    request,
+    url_for,
+)
+from werkzeug.utils import secure_filename
+
+from .registry import registry
+from .sources import FILE_READERS, check_file
+
+uploads = Blueprint("uploads", __name__)
+
+
+def upload_dir() -> str:
+    return current_app.config["UPLOAD_DIR"] or os.path.join(
+        current_app.instance_path, "uploads"
+    )
+
+
+@uploads.route("/upload")
+def upload():
+    return render_template("upload.html", extensions=sorted(FILE_READERS))
+
+
+@uploads.route("/upload", methods=["POST"])
+def upload_post():
+    file = request.files.get("file")
+    if file is None or not file.filename:
+        flash("Choose a file to upload.")
+        return redirect(url_for("uploads.upload"))
+    stem, extension = os.path.splitext(file.filename)
+    extension = extension.lower()
+    if extension not in FILE_READERS:
+        flash("Upload a CSV, Excel or Parquet file.")
+        return redirect(url_for("uploads.upload"))
+
+    name = request.form.get("name", "").strip() or stem
+    directory = upload_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, (secure_filename(name) or "upload") + extension)
+    # Streamed to disk, and only put in place once it parses, so a sync never
+    # reads a partial or broken upload. Hidden files aren't watched.
+    partial_path = os.path.join(directory, f".{os.getpid()}-{os.path.basename(path)}")
+    file.save(partial_path)
+    try:
+        check_file(partial_path)
+    except Exception as e:
+        os.remove(partial_path)
+        flash(f"Couldn't read {file.filename}: {e}")
+        return redirect(url_for("uploads.upload"))
+    os.replace(partial_path, path)
+
+    name = registry.register_file(path, name)
+    registry.schedule_refresh(name)
+    return redirect("/dashboard/")
@@ -0,0 +1,5 @@
+from insight import create_app
+
+# For CLI commands such as `flask db upgrade`: no dashboard, so no pandas,
+# Dash or plotly to import.
+app = create_app(dashboard=False)
@@ -0,0 +1,30 @@
+"""Store dataset snapshots as compressed Arrow
+
+Revision ID: 3c1f6a9e2d47
+Revises: 849f3b72f89f
+Create Date: 2026-10-18 10:12:05.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '3c1f6a9e2d47'
+down_revision = '849f3b72f89f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Snapshots are copies of the spreadsheet, so rather than converting the
+    # old JSON payloads we drop them; the next sync records a fresh one.
+    op.execute('DELETE FROM dataset')
+    op.drop_column('dataset', 'data')
+    op.add_column('dataset', sa.Column('data', sa.LargeBinary(), nullable=False))
+
+
+def downgrade():
+    op.execute('DELETE FROM dataset')
+    op.drop_column('dataset', 'data')
+    op.add_column('dataset', sa.Column('data', postgresql.JSON(astext_type=sa.Text()), nullable=False))
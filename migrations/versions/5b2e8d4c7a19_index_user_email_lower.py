@@ -0,0 +1,24 @@
+"""Index user email case-insensitively
+
+Revision ID: 5b2e8d4c7a19
+Revises: 3c1f6a9e2d47
+Create Date: 2026-10-18 18:02:44.127530
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b2e8d4c7a19'
+down_revision = '3c1f6a9e2d47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_user_email_lower', 'user', [sa.text('lower(email)')], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_user_email_lower', table_name='user')
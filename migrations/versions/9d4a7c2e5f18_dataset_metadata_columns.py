@@ -0,0 +1,30 @@
+"""Record dataset row counts and sizes, and index them for keyset paging
+
+Revision ID: 9d4a7c2e5f18
+Revises: 5b2e8d4c7a19
+Create Date: 2026-10-18 19:04:31.602187
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4a7c2e5f18'
+down_revision = '5b2e8d4c7a19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('dataset', sa.Column('row_count', sa.Integer(), nullable=True))
+    op.add_column('dataset', sa.Column('byte_size', sa.BigInteger(), nullable=True))
+    # Row counts would need every payload decoded, so only sizes are filled in
+    op.execute('UPDATE dataset SET byte_size = length(data)')
+    op.create_index('ix_dataset_created_at_id', 'dataset', ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_dataset_created_at_id', table_name='dataset')
+    op.drop_column('dataset', 'byte_size')
+    op.drop_column('dataset', 'row_count')
@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+# Run the suite offline against SQLite and generated sheet data unless the
+# environment says otherwise.
+os.environ.setdefault("APP_SETTINGS", "config.TestingConfig")
+os.environ.setdefault("SECRET_KEY", "testing")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from insight import create_app, db
+from insight.registry import registry
+
+
+@pytest.fixture
+def app_config():
+    "Settings the `app` fixture adds; test modules override it as needed."
+    return {}
+
+
+@pytest.fixture
+def app(tmp_path, app_config):
+    "An app with empty tables and datasets, writing files under `tmp_path`."
+    snapshots = tmp_path / "snapshots"
+    snapshots.mkdir()
+    app = create_app()
+    app.config.update(SNAPSHOT_DIR=str(snapshots), UPLOAD_DIR=str(tmp_path / "uploads"))
+    app.config.update(app_config)
+    with app.app_context():
+        db.create_all()
+        registry.init_app(app)
+        yield app
+        db.session.remove()
+        db.drop_all()
@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+import html
+import re
+
+import pytest
+
+from insight import db
+from insight.admin import DatasetAdmin
+from insight.data import prepare_data
+from insight.fakes import synthetic_values
+from insight.models import Dataset
+from insight.retention import compact_snapshots
+from insight.snapshots import dump_frame
+
+
+@pytest.fixture
+def app_config():
+    return {"LOGIN_DISABLED": True}
+
+
+def add_snapshots(*rows, data=b"payload"):
+    "Datasets of (spreadsheet_id, hash) pairs, one minute apart, oldest first."
+    start = datetime(2026, 1, 1)
+    for minutes, (spreadsheet_id, digest) in enumerate(rows):
+        db.session.add(
+            Dataset(
+                created_at=start + timedelta(minutes=minutes),
+                spreadsheet_id=spreadsheet_id,
+                spreadsheet_range="Financial Data",
+                spreadsheet_hash=digest,
+                data=data,
+            )
+        )
+    db.session.commit()
+
+
+def remaining():
+    return [
+        (d.spreadsheet_id, d.spreadsheet_hash)
+        for d in Dataset.query.order_by(Dataset.created_at)
+    ]
+
+
+def test_compact_keeps_newest_distinct_snapshots(app):
+    add_snapshots(
+        ("a", "1"), ("a", "2"), ("b", "1"), ("a", "3"), ("a", "2"), ("b", "1")
+    )
+    assert compact_snapshots(keep=2) == 3
+    assert remaining() == [("a", "3"), ("a", "2"), ("b", "1")]
+    assert compact_snapshots(keep=1) == 1
+    assert remaining() == [("a", "2"), ("b", "1")]
+    with pytest.raises(ValueError):
+        compact_snapshots(keep=0)
+
+
+def test_compact_command(app):
+    add_snapshots(("a", "1"), ("a", "1"))
+    result = app.test_cli_runner().invoke(args=["datasets", "compact"])
+    assert "Deleted 1 snapshots" in result.output
+    assert remaining() == [("a", "1")]
+
+
+def test_admin_pages_by_creation_time(app, monkeypatch):
+    monkeypatch.setattr(DatasetAdmin, "page_size", 2)
+    add_snapshots(*[("a", str(i)) for i in range(5)])
+    client = app.test_client()
+
+    seen = []
+    url = "/admin/dataset/"
+    while url:
+        page = client.get(url).get_data(as_text=True)
+        seen += [int(id) for id in re.findall(r'href="/admin/dataset/(\d+).csv"', page)]
+        older = re.search(r'href="([^"]+)">Older<', page)
+        url = older and html.unescape(older.group(1))
+    assert seen == [5, 4, 3, 2, 1]
+    assert client.get("/admin/dataset/?after=nonsense").status_code == 400
+
+
+def test_admin_streams_one_snapshot(app):
+    frame = prepare_data(synthetic_values(30))
+    add_snapshots(("a", "1"), data=dump_frame(frame, "1"))
+    client = app.test_client()
+
+    response = client.get("/admin/dataset/1.csv")
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines[0] == "Date,Department,Product,Sales,COGS,Profit"
+    assert len(lines) == 31
+    assert client.get("/admin/dataset/2.csv").status_code == 404
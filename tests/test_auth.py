@@ -0,0 +1,51 @@
+import pytest
+from sqlalchemy import event
+
+from insight import db
+from insight.auth import user_cache
+from insight.models import User
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.post(
+        "/signup",
+        data={"email": "Ada@Example.com", "name": "Ada", "password": "secret"},
+    )
+    return client
+
+
+def test_login_ignores_email_case(client):
+    response = client.post(
+        "/login", data={"email": "ada@example.COM", "password": "secret"}
+    )
+    assert response.location.endswith("/dashboard/")
+
+
+def test_signup_rejects_email_in_other_case(client):
+    client.post(
+        "/signup",
+        data={"email": "ADA@example.com", "name": "Other", "password": "x"},
+    )
+    assert User.query.count() == 1
+
+
+def test_user_loader_is_cached_until_user_changes(app, client):
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        user_id = User.query.first().id
+        statements.clear()
+        user_cache.invalidate(user_id)
+
+        assert user_cache.get(user_id).name == "Ada"
+        assert user_cache.get(user_id).name == "Ada"
+        assert len(statements) == 1
+
+        User.query.get(user_id).name = "Ada L."
+        db.session.commit()
+        assert user_cache.get(user_id).name == "Ada L."
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listener)
@@ -0,0 +1,20 @@
+import random
+
+import pytest
+
+from benchmarks.load_dashboard import chart_request, table_request
+from insight import create_app
+
+
+@pytest.mark.parametrize("make_request", [table_request, chart_request])
+def test_load_driver_requests_match_callbacks(make_request):
+    app = create_app()
+    app.config["LOGIN_DISABLED"] = True
+    client = app.test_client()
+
+    response = client.post(
+        "/dashboard/_dash-update-component", json=make_request(random.Random(0))
+    )
+
+    assert response.status_code == 200
+    assert response.json["response"]
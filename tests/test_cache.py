@@ -0,0 +1,69 @@
+import threading
+import time
+
+import pytest
+
+from insight.cache import CallbackCache, memoize
+
+
+def test_cache_evicts_least_recently_used():
+    cache = CallbackCache(maxsize=2)
+    cache.get_or_compute("v1", "a", lambda: 1)
+    cache.get_or_compute("v1", "b", lambda: 2)
+    cache.get_or_compute("v1", "a", lambda: 0)
+    cache.get_or_compute("v1", "c", lambda: 3)
+
+    assert cache.get_or_compute("v1", "a", lambda: 0) == 1
+    assert cache.get_or_compute("v1", "b", lambda: 0) == 0
+    assert len(cache) == 2
+
+
+def test_cache_is_emptied_by_new_version():
+    cache = CallbackCache()
+    cache.get_or_compute("v1", "a", lambda: 1)
+    assert cache.get_or_compute("v2", "a", lambda: 2) == 2
+    assert len(cache) == 1
+
+
+def test_concurrent_misses_compute_once():
+    cache = CallbackCache()
+    calls = []
+
+    @memoize(cache, lambda *args: "v1")
+    def slow(department, product):
+        calls.append((department, product))
+        time.sleep(0.05)
+        return [department, product]
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(slow("Hardware", None)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [("Hardware", None)]
+    assert results == [["Hardware", None]] * 8
+
+
+def test_failures_are_not_cached():
+    cache = CallbackCache()
+
+    def fail():
+        raise ValueError
+
+    with pytest.raises(ValueError):
+        cache.get_or_compute("v1", "a", fail)
+    assert cache.get_or_compute("v1", "a", lambda: 1) == 1
+
+
+def test_scopes_are_invalidated_separately():
+    cache = CallbackCache()
+    cache.get_or_compute("v1", "a", lambda: 1, scope="North")
+    cache.get_or_compute("v1", "a", lambda: 2, scope="South")
+
+    assert cache.get_or_compute("v2", "a", lambda: 3, scope="North") == 3
+    assert cache.get_or_compute("v1", "a", lambda: 0, scope="South") == 2
@@ -0,0 +1,153 @@
+import json
+import pathlib
+import shutil
+import subprocess
+
+import numpy as np
+import pytest
+
+from insight import create_app
+from insight.clientside import CLIENT, SERVER, client_payload, render_mode
+from insight.data import prepare_data, to_dollars
+from insight.fakes import synthetic_values
+from insight.filters import apply_filters
+from insight.layout import PNL_TRACES, create_pnl_chart, pnl_series
+from insight.registry import registry
+from insight.sync import DataVersion
+
+SCRIPT = pathlib.Path(__file__).parents[1] / "insight" / "assets" / "clientside.js"
+
+# Loads the asset as a page would, then calls its functions on each case
+RUNNER = """
+const fs = require("fs");
+global.window = {dash_clientside: {no_update: null}};
+eval(fs.readFileSync(process.argv[1], "utf8"));
+const input = JSON.parse(fs.readFileSync(0, "utf8"));
+const insight = window.dash_clientside.insight;
+console.log(JSON.stringify(input.cases.map(function(c) {
+    return {
+        figure: insight.pnl_chart(input.data, c.department, c.product,
+                                  c.granularity, c.start, c.end, input.figure),
+        rows: insight.table_rows(input.data, c.department, c.product)
+    };
+})));
+"""
+
+
+@pytest.fixture(scope="module")
+def version():
+    return DataVersion.build(prepare_data(synthetic_values(2000)), "a" * 64)
+
+
+def test_payload_decodes_to_the_frame(version):
+    payload = client_payload(version)
+    df = version.frame
+    days = payload["first_day"] + np.cumsum(payload["day_steps"])
+    assert (days.astype("datetime64[D]") == df["DateTime"].values).all()
+    departments = np.array(payload["department_names"])[payload["department"]]
+    assert departments.tolist() == df["Department"].tolist()
+    assert payload["profit"] == df["Profit"].tolist()
+    assert payload["version"] == version.token
+
+
+def test_payload_leaves_out_rows_without_a_date():
+    values = synthetic_values(20)
+    version = DataVersion.build(prepare_data(values + [[]]), "b" * 64)
+    payload = client_payload(version)
+    assert len(payload["day_steps"]) == 20
+    assert max(payload["day_steps"]) < 366 * 10
+    days = payload["first_day"] + np.cumsum(payload["day_steps"])
+    dates = version.frame["DateTime"].dropna().values
+    assert (days.astype("datetime64[D]") == dates).all()
+
+
+def test_render_mode_depends_on_the_row_count(version):
+    assert render_mode(version) == SERVER  # outside an app
+    app = create_app()
+    with app.app_context():
+        assert render_mode(version) == CLIENT
+        app.config["CLIENTSIDE_MAX_ROWS"] = 1999
+        assert render_mode(version) == SERVER
+        app.config["CLIENTSIDE_MAX_ROWS"] = 0
+        assert render_mode(version) == SERVER
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+def test_browser_functions_match_the_server(version):
+    cases = [
+        {"department": d, "product": p, "granularity": g, "start": s, "end": e}
+        for d, p in [(None, None), ("Hardware", None), ("Hardware", "Alpha")]
+        for g in ["week", "month", "quarter", "year"]
+        for s, e in [(None, None), ("2018-03-15", "2019-02-03T00:00:00")]
+    ]
+    stdin = json.dumps(
+        {
+            "data": client_payload(version),
+            "figure": create_pnl_chart(version.cube.get(None, None)),
+            "cases": cases,
+        }
+    )
+    output = subprocess.run(
+        ["node", "-e", RUNNER, str(SCRIPT)],
+        input=stdin,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    df = version.frame
+    for case, result in zip(cases, json.loads(output)):
+        series = pnl_series(
+            version.cube.get(
+                case["department"],
+                case["product"],
+                case["granularity"],
+                case["start"],
+                case["end"],
+            )
+        )
+        traces = result["figure"]["data"]
+        assert [t["name"] for t in traces] == [t["name"] for t in PNL_TRACES]
+        assert traces[0]["x"] == series["x"]
+        assert [t["y"] for t in traces] == series["y"]
+
+        rows = to_dollars(apply_filters(df, case["department"], case["product"]))
+        assert result["rows"] == rows.assign(
+            Date=rows["DateTime"].dt.strftime("%Y-%m-%d"),
+            Department=rows["Department"].astype(str),
+            Product=rows["Product"].astype(str),
+        )[["Date", "Department", "Product", "Sales", "COGS", "Profit"]].to_dict(
+            "records"
+        )
+
+
+@pytest.fixture
+def app_config():
+    return {"LOGIN_DISABLED": True}
+
+
+def layout_ids(app):
+    ids = set()
+
+    def walk(node):
+        if isinstance(node, list):
+            for child in node:
+                walk(child)
+        elif isinstance(node, dict):
+            ids.add(node.get("props", {}).get("id"))
+            walk(node.get("props", {}).get("children"))
+
+    walk(app.test_client().get("/dashboard/_dash-layout").json)
+    return ids
+
+
+def test_layout_renders_small_datasets_in_the_browser(app):
+    registry.get()
+    registry.refresh(registry.default)
+    ids = layout_ids(app)
+    assert {"client-data", "client-table", "client-bar-chart"} <= ids
+    assert "sales-table" not in ids
+
+    app.config["CLIENTSIDE_MAX_ROWS"] = 0
+    ids = layout_ids(app)
+    assert {"sales-table", "bar-chart"} <= ids
+    assert "client-data" not in ids
@@ -0,0 +1,216 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from insight.aggregates import TimeCube
+from insight.data import (
+    COLUMNS,
+    FRAME_COLUMNS,
+    fetch_data,
+    parse_money,
+    prepare_data,
+    sheet_rows,
+    to_dollars,
+)
+from insight.fakes import FakeSheetsService, synthetic_values
+from insight.filters import FilterIndex, apply_filters
+from insight.layout import (
+    create_pnl_chart,
+    date_bounds,
+    dependent_options,
+    pnl_series,
+    resample_totals,
+)
+from insight.table import table_page
+
+
+@pytest.mark.parametrize(
+    "text,cents",
+    [
+        ("$ 1,234.56", 123456),
+        ("$ (1,234.56)", -123456),
+        ("($1,234.56)", -123456),
+        ("-$5.00", -500),
+        ("$ -", 0),
+        ("", 0),
+        (None, 0),
+        ("12", 1200),
+        ("0.5", 50),
+        ("1.005", 101),
+        ("€ 3.10", 310),
+    ],
+)
+def test_parse_money(text, cents):
+    assert parse_money(pd.Series([text])).tolist() == [cents]
+
+
+def test_prepare_data_keeps_money_exact():
+    df = prepare_data(synthetic_values(100))
+    assert df["Sales"].dtype == "int64"
+    assert (df["Sales"] - df["COGS"] == df["Profit"]).all()
+    assert to_dollars(df)["Sales"].iloc[0] == df["Sales"].iloc[0] / 100
+
+
+def test_prepare_data_keeps_compact_columns_in_date_order():
+    values = [
+        COLUMNS,
+        ["01/02/2020", " Hardware ", "Alpha", "$ 1.00", "$ 0.40", "$ 0.60"],
+        ["01/01/2020", "Hardware", "Alpha ", "$ 2.00", "$ 1.00", "$ 1.00"],
+        ["01/02/2020", "Software", "Alpha", "$ 3.00", "$ 1.00", "$ 2.00"],
+    ]
+    df = prepare_data(values)
+    assert list(df.columns) == FRAME_COLUMNS
+    assert df.index.tolist() == [1, 0, 2]
+    assert df["Department"].cat.categories.tolist() == ["Hardware", "Software"]
+    assert df["Product"].cat.categories.tolist() == ["Alpha"]
+
+    rows = sheet_rows(df)
+    assert list(rows.columns) == COLUMNS
+    assert rows["Date"].tolist() == [date(2020, 1, d) for d in (1, 2, 2)]
+    assert rows["Sales"].tolist() == [2.0, 1.0, 3.0]
+
+
+def test_date_bounds_skip_blank_rows():
+    values = synthetic_values(20)
+    # Blank rows inside a sheet come back empty, and have no date
+    df = prepare_data(values[:5] + [[]] + values[5:])
+    assert df["DateTime"].isna().iloc[-1]
+    assert date_bounds(df) == [
+        df["DateTime"].min().strftime("%Y-%m-%d"),
+        df["DateTime"].max().strftime("%Y-%m-%d"),
+    ]
+    assert date_bounds(df.iloc[-1:]) == [None, None]
+
+
+def test_monthly_cube_matches_resampled_filters():
+    df = prepare_data(synthetic_values(2000))
+    cube = TimeCube(df)
+    for department, product in [
+        (None, None),
+        ("Hardware", None),
+        (None, "Alpha"),
+        ("Hardware", "Alpha"),
+    ]:
+        expected = resample_totals(apply_filters(df, department, product))
+        pd.testing.assert_frame_equal(
+            cube.get(department, product), expected, check_freq=False
+        )
+    assert cube.get("Hardware", "No such product").empty
+
+
+@pytest.mark.parametrize("granularity", ["week", "month", "quarter", "year"])
+def test_time_cube_rolls_days_up_within_date_range(granularity):
+    df = prepare_data(synthetic_values(2000))
+    cube = TimeCube(df)
+    for start, end in [
+        (None, None),
+        ("2018-03-15", None),
+        ("2019-02-03", "2020-06-30"),
+    ]:
+        dff = apply_filters(df, "Hardware", None)
+        dff = dff[
+            (dff["DateTime"] >= (start or "1900"))
+            & (dff["DateTime"] <= (end or "2100"))
+        ]
+        pd.testing.assert_frame_equal(
+            cube.get("Hardware", None, granularity, start, end),
+            resample_totals(dff, granularity),
+            check_freq=False,
+        )
+    assert cube.get(None, None, granularity, "2030-01-01").empty
+
+
+def test_filter_index_matches_scan():
+    df = prepare_data(synthetic_values(2000))
+    index = FilterIndex(df)
+    for department, product in [
+        (None, None),
+        ("Hardware", None),
+        (None, "Alpha"),
+        ("Hardware", "Alpha"),
+        ("Hardware", "No such product"),
+    ]:
+        pd.testing.assert_frame_equal(
+            apply_filters(df, department, product, index),
+            apply_filters(df, department, product),
+        )
+
+
+def test_dropdowns_narrow_to_choices_with_rows():
+    df = prepare_data(synthetic_values(500))
+    df = df[~((df["Department"] == "Hardware") & (df["Product"] == "Alpha"))]
+    co_occurrence = FilterIndex(df.reset_index(drop=True)).co_occurrence()
+
+    departments, products = dependent_options(co_occurrence)
+    assert [o["value"] for o in departments] == list(df["Department"].unique())
+    assert [o["value"] for o in products] == list(df["Product"].unique())
+
+    departments, products = dependent_options(co_occurrence, "Hardware", "Bravo")
+    assert "Alpha" not in [o["value"] for o in products]
+    rows = len(apply_filters(df, "Hardware", "Bravo"))
+    assert {"label": f"Hardware ({rows:,})", "value": "Hardware"} in departments
+
+
+def test_table_page_slices_sorts_and_filters():
+    df = prepare_data(synthetic_values(100))
+
+    records, page_count = table_page(df, 1, 20)
+    assert page_count == 5
+    assert len(records) == 20
+    assert records[0]["Sales"] == df["Sales"].iloc[20] / 100
+
+    records, _ = table_page(df, 0, 20, [{"column_id": "Sales", "direction": "desc"}])
+    assert records[0]["Sales"] == df["Sales"].max() / 100
+
+    records, page_count = table_page(
+        df, 9, 20, filter_query='{Department} eq "Hardware" && {Sales} > 1000'
+    )
+    expected = df[(df["Department"] == "Hardware") & (df["Sales"] > 100000)]
+    assert page_count == max(-(-len(expected) // 20), 1)
+    assert all(r["Department"] == "Hardware" and r["Sales"] > 1000 for r in records)
+
+
+def test_table_filters_match_unquoted_numbers_as_text():
+    df = prepare_data(synthetic_values(100))
+
+    records, _ = table_page(df, 0, 100, filter_query="{Date} contains 2019")
+    assert len(records) == (df["DateTime"].dt.year == 2019).sum() > 0
+    assert all(r["Date"].year == 2019 for r in records)
+
+    records, _ = table_page(df, 0, 100, filter_query="{Sales} ge 1000.5")
+    assert len(records) == (df["Sales"] >= 100050).sum()
+
+
+def test_pnl_series_matches_chart_traces():
+    totals = TimeCube(prepare_data(synthetic_values(500))).get("Hardware", None)
+    series = pnl_series(totals)
+    figure = create_pnl_chart(totals)
+
+    assert [trace["y"] for trace in figure["data"]] == series["y"]
+    assert figure["data"][0]["x"] == series["x"]
+    assert series["y"][0] == list(totals["Sales"] / 100)
+
+
+def test_fetch_data_reads_blocks_of_rows():
+    values = synthetic_values(1_000)
+    # Blank rows, including at the end of a block, are kept in place
+    values[250] = values[499] = values[500] = []
+    service = FakeSheetsService(values, max_response_rows=300)
+
+    fetched = fetch_data("id", "Financial Data", service=service, block_rows=250)
+
+    assert fetched == values
+    assert set(service.ranges) == {
+        "'Financial Data'!1:250",
+        "'Financial Data'!251:500",
+        "'Financial Data'!501:750",
+        "'Financial Data'!751:1000",
+        "'Financial Data'!1001:1101",
+    }
+
+
+def test_fetch_data_reads_a1_range_in_one_request():
+    service = FakeSheetsService(synthetic_values(10))
+    assert len(fetch_data("id", "Financial Data!A:F", service=service)) == 11
+    assert service.ranges == ["Financial Data!A:F"]
@@ -0,0 +1,117 @@
+import time
+
+import pytest
+
+from insight.fakes import synthetic_values
+from insight.registry import registry
+
+FILTER_OUTPUTS = [
+    ("filter-options", "data"),
+    ("department-filter", "value"),
+    ("product-filter", "value"),
+    ("date-range", "min_date_allowed"),
+    ("date-range", "max_date_allowed"),
+    ("date-range", "start_date"),
+    ("date-range", "end_date"),
+    ("data-version", "data"),
+]
+
+
+@pytest.fixture
+def sheet():
+    return {"values": synthetic_values(50)}
+
+
+@pytest.fixture
+def app_config():
+    return {"REFRESH_TOKEN": "secret"}
+
+
+@pytest.fixture(autouse=True)
+def source(app, sheet):
+    registry.make_source = lambda app, spec: lambda: sheet["values"]
+
+
+def wait_for_version(client, token, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        version = client.get("/datasets/version").json["version"]
+        if version != token:
+            return version
+        time.sleep(0.05)
+    raise TimeoutError("The dataset wasn't refreshed")
+
+
+def poll(client, shown_version):
+    return client.post(
+        "/dashboard/_dash-update-component",
+        json={
+            "output": "..{}..".format(
+                "...".join(f"{id}.{prop}" for id, prop in FILTER_OUTPUTS)
+            ),
+            "outputs": [{"id": id, "property": prop} for id, prop in FILTER_OUTPUTS],
+            "inputs": [
+                {"id": "dataset-selector", "property": "value", "value": None},
+                {"id": "version-poll", "property": "n_intervals", "value": 3},
+            ],
+            "state": [
+                {"id": "data-version", "property": "data", "value": shown_version}
+            ],
+            "changedPropIds": ["version-poll.n_intervals"],
+        },
+    )
+
+
+def test_refresh_needs_a_login_or_the_token(app):
+    client = app.test_client()
+    assert client.post("/datasets/refresh").status_code == 401
+    assert client.get("/datasets/version").status_code == 401
+
+    response = client.post(
+        "/datasets/refresh", headers={"Authorization": "Bearer secret"}
+    )
+    assert response.status_code == 202
+    assert response.json["dataset"] == registry.default
+
+
+def test_refresh_fetches_in_the_background(app, sheet):
+    app.config["LOGIN_DISABLED"] = True
+    client = app.test_client()
+    first = wait_for_version(client, "")
+
+    sheet["values"] = synthetic_values(60)
+    assert client.post("/datasets/refresh").status_code == 202
+    assert wait_for_version(client, first) != first
+    assert client.post("/datasets/refresh?dataset=Nope").status_code == 404
+
+
+def test_refreshing_an_unloaded_dataset_fetches_it_once(app, sheet):
+    fetched = []
+
+    def fetch():
+        fetched.append(sheet["values"])
+        return sheet["values"]
+
+    registry.make_source = lambda app, spec: fetch
+    assert registry.loaded() == []
+    assert registry.schedule_refresh(registry.default)
+    deadline = time.monotonic() + 10
+    while registry._refreshing and time.monotonic() < deadline:
+        time.sleep(0.05)
+    registry._loaded[registry.default].sync.join(10)
+    assert len(fetched) == 1
+    assert len(registry.get().frame) == 50
+
+
+def test_dashboards_are_only_updated_when_the_version_changes(app, sheet):
+    app.config["LOGIN_DISABLED"] = True
+    client = app.test_client()
+    shown = wait_for_version(client, "")
+    assert poll(client, shown).status_code == 204
+
+    sheet["values"] = synthetic_values(60)
+    registry.refresh(registry.default)
+    response = poll(client, shown).json["response"]
+    assert response["data-version"]["data"] == registry.version().token != shown
+    # The user's filter selections are left alone
+    assert "department-filter" not in response
@@ -0,0 +1,36 @@
+import io
+
+import pandas as pd
+import pytest
+
+from insight.data import prepare_data
+from insight.export import export_url, iter_csv, iter_parquet
+from insight.fakes import synthetic_values
+
+
+@pytest.fixture
+def df():
+    return prepare_data(synthetic_values(250))
+
+
+def test_csv_is_streamed_in_chunks(df):
+    chunks = list(iter_csv(df, chunk_rows=100))
+    assert len(chunks) == 4
+
+    exported = pd.read_csv(io.StringIO("".join(chunks)))
+    assert len(exported) == 250
+    assert exported["Sales"].sum() == pytest.approx(df["Sales"].sum() / 100)
+
+
+def test_parquet_is_streamed_in_row_groups(df):
+    chunks = list(iter_parquet(df, chunk_rows=100))
+    exported = pd.read_parquet(io.BytesIO(b"".join(chunks)))
+    assert len(exported) == 250
+    assert list(exported["Profit"]) == list(df["Profit"] / 100)
+
+
+def test_export_url():
+    assert export_url("csv") == "/export/csv"
+    assert export_url("parquet", "Hardware", None) == (
+        "/export/parquet?department=Hardware"
+    )
@@ -1,5 +1,8 @@
 import requests
 import multiprocessing
+import os
+import subprocess
+import sys
 
 from flask import Flask
 from flask_testing import LiveServerTestCase
@@ -16,6 +19,21 @@ def test_version():
     assert __version__ == "0.1.0"
 
 
+def test_cli_app_skips_the_dashboard_imports():
+    code = (
+        "import sys, manage; "
+        "print(sorted({'pandas', 'dash', 'plotly'} & set(sys.modules)))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == "[]"
+
+
 class MyTest(LiveServerTestCase):
     def create_app(self):
         app = create_app()
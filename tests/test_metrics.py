@@ -0,0 +1,58 @@
+import random
+
+import pytest
+
+from benchmarks.load_dashboard import table_request
+from insight import create_app
+from insight.metrics import Histogram, SamplingProfiler
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.config["LOGIN_DISABLED"] = True
+    return app.test_client()
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", "Latency.", [0.1, 1])
+    for value in [0.05, 0.1, 0.5, 3]:
+        histogram.observe(value, callback="a")
+
+    samples = {
+        (name, dict(labels).get("le")): value
+        for name, labels, value in histogram.samples()
+    }
+    assert samples[("latency_seconds_bucket", "0.1")] == 2
+    assert samples[("latency_seconds_bucket", "1")] == 3
+    assert samples[("latency_seconds_bucket", "+Inf")] == 4
+    assert samples[("latency_seconds_sum", None)] == pytest.approx(3.65)
+
+
+def test_callbacks_are_timed_and_measured(client):
+    client.post(
+        "/dashboard/_dash-update-component", json=table_request(random.Random(0))
+    )
+
+    body = client.get("/metrics").get_data(as_text=True)
+    assert 'insight_callback_seconds_count{callback="update_table"}' in body
+    assert 'insight_callback_response_bytes_count{callback="update_table"}' in body
+    assert 'insight_callback_rows_count{callback="update_table"}' in body
+    assert "insight_callback_cache_misses_total" in body
+
+
+def test_metrics_need_a_login_or_the_token(client):
+    client.application.config["LOGIN_DISABLED"] = False
+    assert client.get("/metrics").status_code == 401
+
+    client.application.config["METRICS_TOKEN"] = "secret"
+    assert client.get("/metrics").status_code == 401
+    for token, status in [("", 401), ("secret", 200)]:
+        headers = {"Authorization": f"Bearer {token}"}
+        assert client.get("/metrics", headers=headers).status_code == status
+
+
+def test_profiler_samples_calls(tmp_path):
+    profiler = SamplingProfiler(rate=1.0, directory=str(tmp_path))
+    assert profiler.run("sum", sum, [1, 2]) == 3
+    assert [p.name.split("-")[0] for p in tmp_path.iterdir()] == ["sum"]
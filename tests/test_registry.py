@@ -0,0 +1,78 @@
+import pytest
+
+from insight import db
+from insight.data import prepare_data, spreadsheet_hash
+from insight.fakes import synthetic_values
+from insight.models import Dataset
+from insight.registry import DatasetSpec, registry, snapshot_filename
+from insight.snapshots import dump_frame
+
+
+def unavailable():
+    raise RuntimeError("Sheets is down")
+
+
+@pytest.fixture
+def app_config():
+    return {
+        "DATASETS": {
+            name: {"spreadsheet_id": f"{name}-id", "range": "Financial Data"}
+            for name in ["North", "South", "West"]
+        }
+    }
+
+
+@pytest.fixture(autouse=True)
+def offline(app):
+    # Serve only the snapshots written by the tests
+    registry.make_source = lambda app, spec: unavailable
+
+
+def write_snapshot(app, name, rows):
+    values = synthetic_values(rows)
+    spec = DatasetSpec(name, f"{name}-id", "Financial Data")
+    path = f"{app.config['SNAPSHOT_DIR']}/{snapshot_filename(spec)}"
+    with open(path, "wb") as f:
+        f.write(dump_frame(prepare_data(values), spreadsheet_hash(values)))
+
+
+def test_datasets_load_on_first_access(app):
+    write_snapshot(app, "South", 20)
+    assert registry.names == ["North", "South", "West"]
+    assert registry.loaded() == []
+
+    assert len(registry.get("South").frame) == 20
+    assert registry.loaded() == ["South"]
+    with pytest.raises(KeyError):
+        registry.get("East")
+
+
+def test_least_recently_used_datasets_are_evicted(app):
+    for name in registry.names:
+        write_snapshot(app, name, 500)
+    registry.get("North")
+    registry.memory_budget = int(registry.memory_usage() * 2.5)
+
+    registry.get("South")
+    registry.get("North")
+    registry.get("West")
+
+    assert registry.loaded() == ["North", "West"]
+    assert registry.memory_usage() <= registry.memory_budget
+
+
+def test_sheets_with_saved_datasets_are_discovered(app):
+    db.session.add(
+        Dataset(
+            spreadsheet_id="other-id",
+            spreadsheet_range="Financial Data",
+            spreadsheet_hash="",
+            data=b"",
+        )
+    )
+    db.session.commit()
+
+    registry.discover()
+    registry.discover()
+
+    assert registry.names == ["North", "South", "West", "Financial Data"]
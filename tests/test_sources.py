@@ -0,0 +1,146 @@
+import csv
+import io
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from insight.data import prepare_data
+from insight.fakes import synthetic_values
+from insight.registry import registry
+from insight.sources import DirectoryWatcher, FileSource, read_file
+
+
+@pytest.fixture
+def values():
+    return synthetic_values(250)
+
+
+@pytest.fixture
+def expected(values):
+    return prepare_data(values).sort_index()
+
+
+def write_csv(path, values):
+    with open(path, "w", newline="") as f:
+        csv.writer(f).writerows(values)
+
+
+def load(name):
+    "The dataset's frame, once its source was read."
+    registry.get(name)
+    registry.refresh(name)
+    return registry.get(name).frame
+
+
+@pytest.fixture
+def app_config():
+    return {"LOGIN_DISABLED": True}
+
+
+def test_csv_is_read_in_typed_chunks(tmp_path, values, expected):
+    path = tmp_path / "sales.csv"
+    write_csv(path, values)
+
+    df = read_file(str(path), chunk_rows=100)
+    pd.testing.assert_frame_equal(df.sort_index(), expected, check_categorical=False)
+    assert df["Department"].dtype == "category"
+    assert df["Sales"].dtype == "int64"
+
+
+def test_excel_cells_may_be_typed(tmp_path, values, expected):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(values[0])
+    for row in expected.itertuples():
+        # Dates and amounts as Excel stores them, rather than as text
+        sheet.append(
+            [row.DateTime, row.Department, row.Product, row.Sales / 100]
+            + [row.COGS / 100, row.Profit / 100]
+        )
+    path = tmp_path / "sales.xlsx"
+    workbook.save(path)
+
+    df = read_file(str(path), chunk_rows=100)
+    pd.testing.assert_frame_equal(df.sort_index(), expected, check_categorical=False)
+
+
+def test_parquet_is_read_in_batches(tmp_path, values, expected):
+    path = tmp_path / "sales.parquet"
+    pd.DataFrame(values[1:], columns=values[0]).to_parquet(path, row_group_size=100)
+
+    df = read_file(str(path), chunk_rows=100)
+    pd.testing.assert_frame_equal(df.sort_index(), expected, check_categorical=False)
+
+
+def test_blank_csv_cells_match_blank_sheet_cells(tmp_path, values):
+    values[5][1] = ""
+    path = tmp_path / "sales.csv"
+    write_csv(path, values)
+
+    df = read_file(str(path), chunk_rows=100)
+    assert "nan" not in df["Department"].cat.categories
+    assert df["Department"].sort_index()[4] == ""
+    pd.testing.assert_frame_equal(
+        df.sort_index(), prepare_data(values).sort_index(), check_categorical=False
+    )
+
+
+def test_missing_columns_are_reported(tmp_path):
+    path = tmp_path / "sales.csv"
+    write_csv(path, [["Date", "Sales"], ["01/02/2020", "1"]])
+    with pytest.raises(ValueError, match="Department, Product, COGS, Profit"):
+        read_file(str(path))
+
+
+def test_file_source_is_hashed_only_when_touched(tmp_path, values):
+    path = tmp_path / "sales.csv"
+    write_csv(path, values)
+    source = FileSource(str(path))
+
+    _, digest = source.fetch()
+    assert source.fetch()[1] == digest
+    write_csv(path, values[:10])
+    assert source.fetch()[1] != digest
+
+
+def test_watched_files_are_served_and_refreshed(app, tmp_path, values):
+    watched = tmp_path / "watched"
+    watched.mkdir()
+    write_csv(watched / "north.csv", values)
+    (watched / "notes.txt").write_text("not data")
+    watcher = DirectoryWatcher(registry, str(watched), 0)
+
+    assert watcher.scan() == ["north"]
+    assert "north" in registry.names
+    assert len(load("north")) == 250
+    assert watcher.scan() == []
+
+    write_csv(watched / "north.csv", values[:21])
+    assert watcher.scan() == ["north"]
+    assert len(load("north")) == 20
+
+
+def test_upload_is_served_as_a_dataset(app, values):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(values)
+    client = app.test_client()
+
+    response = client.post(
+        "/upload",
+        data={"file": (io.BytesIO(buffer.getvalue().encode()), "Q3 sales.csv")},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 302
+    assert len(load("Q3 sales")) == 250
+
+
+def test_unreadable_upload_is_rejected(app):
+    client = app.test_client()
+    response = client.post(
+        "/upload",
+        data={"file": (io.BytesIO(b"Date,Sales\n01/02/2020,1\n"), "sales.csv")},
+        content_type="multipart/form-data",
+    )
+    assert response.location.endswith("/upload")
+    assert "sales" not in registry.names
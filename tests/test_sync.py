@@ -0,0 +1,281 @@
+import os
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from insight.data import FRAME_COLUMNS, MONEY_COLUMNS, prepare_data, spreadsheet_hash
+from insight.fakes import synthetic_values
+from insight.filters import apply_filters
+from insight.ingest import IncrementalIngest
+from insight.models import Dataset
+from insight.snapshots import dump_frame, load_frame
+from insight.sync import DataStore, DataVersion, SharedSheetsSync, SheetsSync
+
+
+def make_sync(app, fetch, **kwargs):
+    return SheetsSync(
+        app, DataStore(), fetch, "sheet-id", "Financial Data", 0, **kwargs
+    )
+
+
+def test_store_swap_leaves_held_versions_intact():
+    store = DataStore()
+    held = store.version
+    assert held.token == "" and held.frame.empty
+
+    values = synthetic_values(10)
+    swapped = store.swap(prepare_data(values), spreadsheet_hash(values))
+    assert store.version is swapped
+    assert len(store.frame) == 10
+    # A callback still holding the old version sees it unchanged
+    assert held.frame.empty and held.spreadsheet_hash == ""
+
+
+def test_unchanged_sheet_is_not_parsed_or_written(app, tmp_path):
+    values = synthetic_values(10)
+    snapshot = tmp_path / "snapshot.arrow"
+    sync = make_sync(app, lambda: values, snapshot_path=str(snapshot))
+    assert sync.sync_once()
+    version, written = sync.store.version, snapshot.stat().st_mtime_ns
+
+    assert not sync.sync_once()
+    assert sync.store.version is version
+    assert snapshot.stat().st_mtime_ns == written
+    assert Dataset.query.count() == 1
+
+
+def test_failed_fetch_keeps_serving_the_current_version(app):
+    def fetch():
+        if sheets:
+            return sheets.pop(0)
+        raise RuntimeError("Sheets is down")
+
+    sheets = [synthetic_values(10)]
+    sync = make_sync(app, fetch)
+    assert sync.sync_once()
+    version = sync.store.version
+
+    with pytest.raises(RuntimeError):
+        sync.sync_once()
+    # The polling loop logs the failure rather than dying
+    sync.run()
+    assert sync.store.version is version
+    assert Dataset.query.count() == 1
+
+
+def test_sync_records_dataset_only_when_content_changes(app):
+    sheets = [synthetic_values(10), synthetic_values(10), synthetic_values(12)]
+    sync = make_sync(app, lambda: sheets.pop(0))
+
+    assert sync.sync_once()
+    first = sync.store.version
+    assert not sync.sync_once()
+    assert sync.store.version is first
+    assert sync.sync_once()
+
+    assert len(sync.store.frame) == 12
+    assert Dataset.query.count() == 2
+    latest = Dataset.query.order_by(Dataset.id.desc()).first()
+    assert latest.row_count == 12
+    assert latest.byte_size == len(latest.data)
+
+
+def test_load_snapshot_prefers_local_file(app, tmp_path):
+    values = synthetic_values(5)
+    snapshot = tmp_path / "snapshot.arrow"
+    snapshot.write_bytes(dump_frame(prepare_data(values), spreadsheet_hash(values)))
+
+    def unavailable():
+        raise RuntimeError("Sheets is down")
+
+    sync = make_sync(app, unavailable, snapshot_path=str(snapshot))
+    assert sync.load_snapshot()
+    assert len(sync.store.frame) == 5
+    with pytest.raises(RuntimeError):
+        sync.sync_once()
+    assert len(sync.store.frame) == 5
+
+
+def test_load_snapshot_falls_back_to_latest_dataset(app, tmp_path):
+    make_sync(app, lambda: synthetic_values(7)).sync_once()
+
+    sync = make_sync(app, None, snapshot_path=str(tmp_path / "missing.arrow"))
+    assert sync.load_snapshot()
+    assert len(sync.store.frame) == 7
+
+
+def test_snapshot_round_trip():
+    values = synthetic_values(50)
+    df = prepare_data(values).reset_index(drop=True)
+
+    loaded, digest = load_frame(dump_frame(df, spreadsheet_hash(values)))
+
+    assert digest == spreadsheet_hash(values)
+    pd.testing.assert_frame_equal(loaded, df)
+
+
+def test_store_serves_empty_frame_before_first_load():
+    frame = DataStore().frame
+    assert frame.empty
+    assert set(FRAME_COLUMNS) <= set(frame.columns)
+
+
+def ledger(rows, seed=0, start=date(2018, 1, 1)):
+    "Sheet values sorted by date, like an append-only ledger."
+    values = synthetic_values(rows, seed=seed, start=start)
+    return values[:1] + sorted(
+        values[1:], key=lambda row: datetime.strptime(row[0], "%m/%d/%Y")
+    )
+
+
+def assert_matches_full_rebuild(version, values):
+    expected = DataVersion.build(prepare_data(values), "")
+    pd.testing.assert_frame_equal(version.frame, expected.frame)
+    np.testing.assert_array_equal(version.sheet_positions(), expected.sheet_positions())
+    for key in [("Hardware", None), (None, "Alpha"), ("Hardware", "Alpha")]:
+        for granularity in ["week", "month"]:
+            pd.testing.assert_frame_equal(
+                version.cube.get(*key, granularity),
+                expected.cube.get(*key, granularity),
+                check_freq=False,
+            )
+        pd.testing.assert_frame_equal(
+            apply_filters(version.frame, *key, version.index),
+            apply_filters(version.frame, *key),
+        )
+
+
+def test_ingest_parses_only_changed_blocks():
+    first = ledger(10_000)
+    ingest = IncrementalIngest(block_rows=4096)
+    assert ingest.ingest(first, "a", None)[0] == 0
+
+    appended = first + ledger(100, seed=1, start=date(2021, 1, 1))[1:]
+    prefix, tail = ingest.ingest(appended, "b", "a")
+    assert prefix == 10_000
+    assert list(tail.index.sort_values()) == list(range(10_000, 10_100))
+
+    edited = [row[:] for row in appended]
+    edited[9000][3] = "$ 1.00"
+    assert ingest.ingest(edited, "c", "b")[0] == 8192
+
+    edited[10][3] = "$ 1.00"
+    assert ingest.ingest(edited, "d", "c")[0] == 0
+
+
+def test_sync_extends_version_on_append(app):
+    first = ledger(10_000)
+    appended = first + ledger(100, seed=1, start=date(2021, 1, 1))[1:]
+    sheets = [first, appended]
+    sync = make_sync(app, lambda: sheets.pop(0))
+    sync.sync_once()
+    sync.sync_once()
+
+    assert len(sync.store.frame) == 10_100
+    assert_matches_full_rebuild(sync.store.version, appended)
+    # The ledger's rows are in date order, so no positions are kept
+    assert sync.store.version.positions is None
+
+
+def test_extended_positions_stay_int32(app):
+    first = synthetic_values(1_000)
+    appended = first + ledger(100, seed=1, start=date(2021, 1, 1))[1:]
+    sheets = [first, appended]
+    sync = make_sync(app, lambda: sheets.pop(0))
+    sync.sync_once()
+    sync.sync_once()
+
+    version = sync.store.version
+    assert version.positions.dtype == np.int32
+    assert isinstance(version.frame.index, pd.RangeIndex)
+    assert_matches_full_rebuild(version, appended)
+
+
+def test_sync_merges_changed_rows(app):
+    first = ledger(10_000)
+    edited = [row[:] for row in first]
+    edited[9_000][1] = "Consulting"
+    edited[9_500][0] = "01/01/2018"
+    sheets = [first, edited]
+    sync = make_sync(app, lambda: sheets.pop(0))
+    sync.sync_once()
+    sync.sync_once()
+
+    assert_matches_full_rebuild(sync.store.version, edited)
+    assert sync.store.version.positions.dtype == np.int32
+
+
+def test_shared_sync_fetches_once_for_all_workers(app, tmp_path):
+    sheets = [synthetic_values(50), synthetic_values(60)]
+    fetched = []
+
+    def fetch():
+        fetched.append(sheets[0])
+        return sheets.pop(0)
+
+    shared = str(tmp_path / "shared.arrow")
+    leader, follower = [
+        SharedSheetsSync(
+            app, DataStore(), fetch, "sheet-id", "Financial Data", 0, shared_path=shared
+        )
+        for _ in range(2)
+    ]
+    assert leader._acquire_lock()
+    assert not follower._acquire_lock()
+
+    leader.sync_once()
+    assert follower.load_snapshot()
+    frame = follower.store.frame
+    assert len(frame) == 50
+    # Columns are views of the shared mapping, even once the cube and filter
+    # index were built from them and rows were filtered
+    apply_filters(frame, "Hardware", None, follower.store.version.index)
+    pd.testing.assert_frame_equal(frame[frame["Sales"] > 0], frame)
+    for column in ["DateTime", *MONEY_COLUMNS]:
+        assert not frame[column].values.flags.writeable
+    assert not follower.follow()
+
+    leader.sync_once()
+    assert follower.follow()
+    assert len(follower.store.frame) == 60
+    assert len(fetched) == 2
+
+    leader._lock_file.close()
+    assert follower._acquire_lock()
+
+
+def test_shared_sync_followers_ask_the_leader_to_refresh(app, tmp_path):
+    sheets = [synthetic_values(50), synthetic_values(60)]
+    fetched = []
+
+    def fetch():
+        fetched.append(sheets[0])
+        return sheets.pop(0)
+
+    shared = str(tmp_path / "shared.arrow")
+    leader, follower = [
+        SharedSheetsSync(
+            app, DataStore(), fetch, "sheet-id", "Financial Data", 0, shared_path=shared
+        )
+        for _ in range(2)
+    ]
+    assert leader._acquire_lock()
+    leader.sync_once()
+    assert follower.load_snapshot()
+    written = os.stat(shared).st_mtime_ns
+
+    # A refresh reaching the follower, e.g. POST /datasets/refresh
+    assert not follower.sync_once()
+    assert len(fetched) == 1
+    assert os.stat(shared).st_mtime_ns == written
+    assert not follower.store.frame["Sales"].values.flags.writeable
+
+    # The leader runs the requested sync, and the follower maps the result
+    assert leader._take_request()
+    assert not leader._take_request()
+    leader.sync_once()
+    assert follower.follow()
+    assert len(follower.store.frame) == 60
+    assert len(fetched) == 2